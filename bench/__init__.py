@@ -0,0 +1,5 @@
+"""Benchmarks of the OpenAudio integration against the stand-in API
+
+Run from the repository root, e.g. python -m bench.poll --help. Every
+benchmark prints its results as JSON, --output also writes them to a file.
+"""
@@ -0,0 +1,89 @@
+"""Helpers shared by the benchmarks"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import tempfile
+
+from collections.abc import AsyncIterator, Sequence
+from contextlib import asynccontextmanager
+
+from homeassistant.core import HomeAssistant
+from homeassistant.loader import DATA_CUSTOM_COMPONENTS
+from pytest_homeassistant_custom_component.common import async_test_home_assistant
+
+from custom_components.openaudio.pyopenaudio.cli import percentile
+
+
+def summarize(seconds: Sequence[float]) -> dict | None:
+    """Mean, percentiles and max of durations, in milliseconds"""
+    if not seconds:
+        return None
+    ordered = sorted(seconds)
+    return {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+        "p50_ms": round(percentile(ordered, 50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+def add_standin_arguments(parser: argparse.ArgumentParser) -> None:
+    """Arguments shaping the stand-in API"""
+    parser.add_argument("--devices", type=int, default=2)
+    parser.add_argument("--zones", type=int, default=8, help="zones per device")
+    parser.add_argument("--inputs", type=int, default=4, help="inputs per device")
+    parser.add_argument(
+        "--latency", type=float, default=0.02, help="seconds per request"
+    )
+    parser.add_argument(
+        "--jitter", type=float, default=0.005, help="seconds of latency jitter"
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="share of requests failing"
+    )
+    parser.add_argument(
+        "--no-etags", dest="etags", action="store_false", help="never answer 304"
+    )
+    parser.add_argument("--output", help="also write the results to this file")
+
+
+def standin_options(args: argparse.Namespace) -> dict:
+    """Keyword arguments of StandInApi from the parsed arguments"""
+    return {
+        "devices": args.devices,
+        "zones": args.zones,
+        "inputs": args.inputs,
+        "latency": args.latency,
+        "jitter": args.jitter,
+        "error_rate": args.error_rate,
+        "etags": args.etags,
+    }
+
+
+def report(results: dict, output: str | None) -> None:
+    """Print results as JSON, and write them to output if given"""
+    text = json.dumps(results, indent=2)
+    print(text)
+    if output:
+        with open(output, "w", encoding="utf-8") as file:
+            file.write(text + "\n")
+    sys.stdout.flush()
+
+
+@asynccontextmanager
+async def home_assistant() -> AsyncIterator[HomeAssistant]:
+    """A test Home Assistant that loads the integration from custom_components
+
+    Registries and snapshots are stored in a temporary directory.
+    """
+    with tempfile.TemporaryDirectory() as storage_dir:
+        async with async_test_home_assistant(storage_dir=storage_dir) as hass:
+            hass.data.pop(DATA_CUSTOM_COMPONENTS)
+            try:
+                yield hass
+            finally:
+                await hass.async_stop(force=True)
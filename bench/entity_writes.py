@@ -0,0 +1,259 @@
+"""Cost of a state write of the OpenAudio entities
+
+Sets up a config entry against the stand-in API and times, for every
+zone, input and sensor entity, reading the properties a state write reads
+and async_write_ha_state as a whole, i.e. those reads plus Home Assistant
+building and storing the state. This is what every entity a poll changed
+costs. As the baseline, zones and inputs computing what they show from
+the record JSON on every read, as they did before the typed records of
+models.py, are added to the same platform and timed alike:
+
+    python -m bench.entity_writes --zones 16 --inputs 8 --writes 200
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from homeassistant.components.media_player import MediaPlayerState
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.entity import Entity
+
+from custom_components.openaudio.media_player import InputMediaPlayer, Zone
+from tests.common import setup_entry
+from tests.standin import StandInApi
+
+from .common import add_standin_arguments, home_assistant, report, standin_options
+
+
+# What async_write_ha_state reads of an entity to build its state
+PROPERTIES = (
+    "available",
+    "state",
+    "capability_attributes",
+    "state_attributes",
+    "extra_state_attributes",
+    "name",
+    "icon",
+    "supported_features",
+)
+
+INPUT_ICONS = {
+    "Airplay": "mdi:cast-audio-variant",
+    "DLNA": "mdi:cast-audio",
+    "Spotify": "mdi:spotify",
+    "USB": "mdi:usb",
+    "Bluetooth": "mdi:bluetooth-audio",
+    "RCA": "mdi:audio-input-rca",
+    "Optical": "mdi:laser-pointer",
+    "Google Cast": "mdi:cast-audio",
+}
+
+
+class LegacyZone(Zone):
+    """Zone computing what it shows from the record JSON on every read"""
+
+    @property
+    def unique_id(self) -> str:
+        return f"legacy_zone_{self._zone_id}"
+
+    @property
+    def name(self) -> str:
+        return f'Legacy {self._raw["name"]} Zone'
+
+    @property
+    def extra_state_attributes(self):
+        attributes = {}
+        zone_data = self._raw
+        if "warnings" in zone_data and zone_data["warnings"]:
+            attributes["warnings"] = zone_data["warnings"]
+            attributes["warning_count"] = len(zone_data["warnings"])
+        return attributes
+
+    @property
+    def state(self) -> MediaPlayerState | None:
+        zone_data = self._raw
+        if "active_input" in zone_data and zone_data["active_input"] is not None:
+            return MediaPlayerState.PLAYING
+        if zone_data.get("enabled", True):
+            return MediaPlayerState.ON
+        return MediaPlayerState.OFF
+
+    @property
+    def media_title(self) -> str | None:
+        zone_data = self._raw
+        if "active_input" in zone_data and zone_data["active_input"] is not None:
+            active_input_id = zone_data["active_input"]
+            if active_input_id in self._amp.inputs:
+                input_data = self._amp.inputs[active_input_id].raw
+                if input_data.get("input_class") == 0:
+                    input_name = input_data.get("name")
+                    if input_name:
+                        return f"Playing from {input_name}"
+                input_type = input_data.get("input_type", "Unknown")
+                return f"Playing from {input_type}"
+        return None
+
+    @property
+    def icon(self) -> str | None:
+        zone_data = self._raw
+        if "warnings" in zone_data and zone_data["warnings"]:
+            return "mdi:speaker-message"
+        if self.state == MediaPlayerState.PLAYING:
+            return "mdi:speaker-play"
+        if self.state == MediaPlayerState.ON:
+            return "mdi:speaker"
+        return "mdi:speaker-off"
+
+    @property
+    def volume_level(self) -> float | None:
+        return float(self._raw["volume"]) / 100.0
+
+
+class LegacyInput(InputMediaPlayer):
+    """Input computing what it shows from the record JSON on every read"""
+
+    @property
+    def unique_id(self) -> str:
+        return f"legacy_input_{self._input_id}"
+
+    @property
+    def name(self) -> str:
+        return f'Legacy Source {self._raw["name"]} Input'
+
+    @property
+    def state(self) -> MediaPlayerState | None:
+        if self._raw.get("enabled", True):
+            return MediaPlayerState.ON
+        return MediaPlayerState.OFF
+
+    @property
+    def volume_level(self) -> float | None:
+        input_data = self._raw
+        if "volume" in input_data and input_data["volume"] is not None:
+            return float(input_data["volume"]) / 100.0
+        return None
+
+    @property
+    def source(self) -> str:
+        input_type = self._raw["input_type"]
+        return input_type[0] if isinstance(input_type, list) else input_type
+
+    @property
+    def source_list(self) -> list[str]:
+        available_types = self._raw["available_types"]
+        current_source = self.source
+        if current_source and current_source not in available_types:
+            return available_types + [current_source]
+        return available_types
+
+    @property
+    def icon(self):
+        # The map was built on every call
+        return dict(INPUT_ICONS).get(self.source, "mdi:music-box")
+
+
+def _entities(hass: HomeAssistant, entry_id: str) -> dict[str, list[Entity]]:
+    """Entities of the config entry by kind: zones, inputs and sensors"""
+    kinds: dict[str, list[Entity]] = {"zones": [], "inputs": [], "sensors": []}
+    registry = er.async_get(hass)
+    for registry_entry in er.async_entries_for_config_entry(registry, entry_id):
+        component = hass.data[registry_entry.domain]
+        entity = component.get_entity(registry_entry.entity_id)
+        if isinstance(entity, Zone):
+            kinds["zones"].append(entity)
+        elif isinstance(entity, InputMediaPlayer):
+            kinds["inputs"].append(entity)
+        else:
+            kinds["sensors"].append(entity)
+    return kinds
+
+
+async def _add_legacy(hass: HomeAssistant, kinds: dict[str, list[Entity]]) -> None:
+    """Add a legacy twin of every zone and input to their platform"""
+    legacy_zones = [
+        LegacyZone(zone._amp, zone.coordinator, zone._config_entry, zone._zone_id)
+        for zone in kinds["zones"]
+    ]
+    legacy_inputs = [
+        LegacyInput(source._amp, source.coordinator, source._config_entry, source._input_id)
+        for source in kinds["inputs"]
+    ]
+    if entity := next(iter(kinds["zones"] + kinds["inputs"]), None):
+        await entity.platform.async_add_entities(legacy_zones + legacy_inputs)
+    await hass.async_block_till_done()
+    kinds["legacy_zones"] = legacy_zones
+    kinds["legacy_inputs"] = legacy_inputs
+
+
+def _read_properties(entity: Entity) -> None:
+    for name in PROPERTIES:
+        getattr(entity, name)
+
+
+def _write_state(entity: Entity) -> None:
+    entity.async_write_ha_state()
+
+
+def _time(entities: list[Entity], action, times: int, repeats: int) -> dict:
+    """Microseconds per entity, the best and the median of repeats"""
+    per_entity = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(times):
+            for entity in entities:
+                action(entity)
+        elapsed = time.perf_counter() - start
+        per_entity.append(elapsed / (times * len(entities)) * 1e6)
+    return {
+        "min_us": round(min(per_entity), 2),
+        "median_us": round(statistics.median(per_entity), 2),
+    }
+
+
+def _time_entities(entities: list[Entity], writes: int, repeats: int) -> dict:
+    return {
+        "entities": len(entities),
+        "properties": _time(entities, _read_properties, writes, repeats),
+        "write": _time(entities, _write_state, writes, repeats),
+    }
+
+
+async def run(args: argparse.Namespace) -> dict:
+    """Run the benchmark, return its results"""
+    async with home_assistant() as hass, StandInApi(**standin_options(args)) as api:
+        entry = await setup_entry(hass, api)
+        kinds = _entities(hass, entry.entry_id)
+        await _add_legacy(hass, kinds)
+        results = {
+            kind: _time_entities(entities, args.writes, args.repeats)
+            for kind, entities in kinds.items()
+            if entities
+        }
+        await hass.config_entries.async_unload(entry.entry_id)
+    return {
+        "benchmark": "entity_writes",
+        "standin": standin_options(args),
+        "writes": args.writes,
+        "repeats": args.repeats,
+        **results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    add_standin_arguments(parser)
+    parser.set_defaults(latency=0.0, jitter=0.0)
+    parser.add_argument("--writes", type=int, default=200, help="writes per entity")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+    report(asyncio.run(run(args)), args.output)
+
+
+if __name__ == "__main__":
+    main()
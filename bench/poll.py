@@ -0,0 +1,118 @@
+"""Poll and command benchmark of OpenAudioHub
+
+Measures the wall time of OpenAudioHub.fetch_data, the requests, bytes
+and connections opened every poll costs, and the round trip of zone
+volume commands, against a stand-in API of the given size and latency:
+
+    python -m bench.poll --devices 4 --zones 8 --inputs 4 --latency 0.03
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+from custom_components.openaudio.hub import OpenAudioHub
+from custom_components.openaudio.pyopenaudio import UnexpectedException
+from tests.standin import StandInApi
+
+from .common import add_standin_arguments, report, standin_options, summarize
+
+
+async def _poll(hub: OpenAudioHub, api: StandInApi, polls: int) -> dict:
+    """Run polls fetch_data rounds, return their cost"""
+    durations = []
+    failures = 0
+    stats = hub.request_stats
+    requests_before = sum(api.requests.values())
+    bytes_before = stats.bytes_received
+    opened_before = stats.connections_opened
+    reused_before = stats.connections_reused
+    for _ in range(polls):
+        start = time.perf_counter()
+        try:
+            await hub.fetch_data()
+        except (UnexpectedException, asyncio.TimeoutError):
+            failures += 1
+            continue
+        durations.append(time.perf_counter() - start)
+    return {
+        "polls": polls,
+        "failures": failures,
+        "wall_time": summarize(durations),
+        "requests_per_poll": round(
+            (sum(api.requests.values()) - requests_before) / polls, 2
+        ),
+        "bytes_per_poll": round((stats.bytes_received - bytes_before) / polls, 1),
+        # Kept-alive connections make this 0 once the pool is warm
+        "connections_opened_per_poll": round(
+            (stats.connections_opened - opened_before) / polls, 2
+        ),
+        "connections_reused_per_poll": round(
+            (stats.connections_reused - reused_before) / polls, 2
+        ),
+    }
+
+
+async def _commands(hub: OpenAudioHub, api: StandInApi, commands: int) -> dict:
+    """Send commands zone volume commands one after the other"""
+    zone_ids = list(api.zones)
+    round_trips = []
+    failures = 0
+    for index in range(commands):
+        start = time.perf_counter()
+        try:
+            await hub.set_zone_volume(zone_ids[index % len(zone_ids)], index % 100)
+        except (UnexpectedException, asyncio.TimeoutError):
+            failures += 1
+            continue
+        round_trips.append(time.perf_counter() - start)
+    return {
+        "commands": commands,
+        "failures": failures,
+        "round_trip": summarize(round_trips),
+    }
+
+
+async def run(args: argparse.Namespace) -> dict:
+    """Run the benchmark, return its results"""
+    async with StandInApi(**standin_options(args)) as api:
+        hub = OpenAudioHub(None, api.host, args.max_concurrent_requests)
+        try:
+            await hub.verify_connection()
+            await hub.initialize()
+            cold = await _poll(hub, api, 1)
+            steady = await _poll(hub, api, args.polls)
+            # A command makes the next poll read the full payloads
+            commands = await _commands(hub, api, args.commands)
+            after_command = await _poll(hub, api, 1)
+        finally:
+            await hub.async_close()
+        return {
+            "benchmark": "poll",
+            "standin": standin_options(args),
+            "max_concurrent_requests": args.max_concurrent_requests,
+            "zones": len(api.zones),
+            "inputs": len(api.inputs),
+            "cold_poll": cold,
+            "steady_polls": steady,
+            "poll_after_commands": after_command,
+            "commands": commands,
+            "client": hub.request_stats.as_dict(),
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    add_standin_arguments(parser)
+    parser.add_argument("--polls", type=int, default=50)
+    parser.add_argument("--commands", type=int, default=50)
+    parser.add_argument("--max-concurrent-requests", type=int, default=4)
+    args = parser.parse_args()
+    report(asyncio.run(run(args)), args.output)
+
+
+if __name__ == "__main__":
+    main()
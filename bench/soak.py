@@ -0,0 +1,298 @@
+"""Soak test of the OpenAudio coordinators
+
+Sets up a config entry against the stand-in API and drives its update
+coordinators for many cycles. Along the way devices leave and come back,
+zone volumes are sent in bursts and the API has outages and failing
+requests. Memory, asyncio tasks and open sockets are sampled as it goes
+and checked against bounds at the end:
+
+    python -m bench.soak --cycles 20000 --output soak.json
+
+Exits with 1 when a bound is exceeded.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import logging
+import os
+import sys
+import time
+import tracemalloc
+
+from homeassistant.const import STATE_UNAVAILABLE
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+
+from custom_components.openaudio.const import (
+    DOMAIN,
+    TIER_DEVICES,
+    TIER_METRICS,
+    TIER_ZONES,
+)
+from custom_components.openaudio.pyopenaudio import client as client_module
+from tests.common import setup_entry
+from tests.standin import StandInApi
+
+from .common import add_standin_arguments, home_assistant, report, standin_options
+
+
+def _open_sockets() -> int | None:
+    """Sockets open in this process, None where /proc isn't available
+
+    The stand-in API runs in the same process, a connection counts twice.
+    """
+    try:
+        fds = os.listdir("/proc/self/fd")
+    except OSError:
+        return None
+    sockets = 0
+    for fd in fds:
+        try:
+            sockets += os.readlink(f"/proc/self/fd/{fd}").startswith("socket:")
+        except OSError:
+            continue
+    return sockets
+
+
+def _traced_kib() -> float:
+    """Memory allocated since tracemalloc started
+
+    Log records are left out, under pytest every record is kept for the
+    report and would look like a leak.
+    """
+    size = 0
+    for stat in tracemalloc.take_snapshot().statistics("filename"):
+        filename = stat.traceback[0].filename
+        if filename != logging.__file__ and f"{os.sep}_pytest{os.sep}" not in filename:
+            size += stat.size
+    return round(size / 1024, 1)
+
+
+def _sample(cycle: int) -> dict:
+    # Compare what is retained, not where the collector happens to be
+    gc.collect()
+    return {
+        "cycle": cycle,
+        "memory_kb": _traced_kib(),
+        "tasks": len(asyncio.all_tasks()),
+        "sockets": _open_sockets(),
+    }
+
+
+def _available_entities(hass: HomeAssistant, entry_id: str) -> int:
+    """Entities of the config entry that have an available state"""
+    return sum(
+        (state := hass.states.get(entity.entity_id)) is not None
+        and state.state != STATE_UNAVAILABLE
+        for entity in er.async_entries_for_config_entry(er.async_get(hass), entry_id)
+    )
+
+
+async def _burst(hub, zone_ids: list[str], size: int, cycle: int) -> int:
+    """Send size zone volumes at once, return how many failed"""
+    results = await asyncio.gather(
+        *(
+            hub.set_zone_volume(
+                zone_ids[index % len(zone_ids)], (cycle + index) % 100
+            )
+            for index in range(size)
+        ),
+        return_exceptions=True,
+    )
+    return sum(isinstance(result, Exception) for result in results)
+
+
+def _violations(
+    args: argparse.Namespace, baseline: dict, samples: list[dict]
+) -> list[str]:
+    """Check the samples against the bounds, memory after the warmup"""
+    violations = []
+    steady = [
+        sample for sample in samples if sample["cycle"] > args.warmup
+    ] or samples[-1:]
+    growth = steady[-1]["memory_kb"] - steady[0]["memory_kb"]
+    if growth > args.max_memory_growth_kb:
+        violations.append(f"memory grew by {growth:.1f} KiB after the warmup")
+    tasks = max(sample["tasks"] for sample in samples)
+    if tasks > baseline["tasks"] + args.max_extra_tasks:
+        violations.append(f"{tasks} tasks, {baseline['tasks']} after setup")
+    if baseline["sockets"] is not None:
+        sockets = max(sample["sockets"] for sample in samples)
+        if sockets > baseline["sockets"] + args.max_extra_sockets:
+            violations.append(f"{sockets} sockets, {baseline['sockets']} after setup")
+    return violations
+
+
+async def soak(hass: HomeAssistant, args: argparse.Namespace) -> dict:
+    """Run the soak test on hass, return its results"""
+    # Let the breaker close again within the run, an outage would
+    # otherwise fail every cycle for breaker_reset_timeout seconds
+    reset_timeout = client_module.breaker_reset_timeout
+    client_module.breaker_reset_timeout = args.breaker_reset_timeout
+    try:
+        async with StandInApi(**standin_options(args)) as api:
+            return await _soak(hass, api, args)
+    finally:
+        client_module.breaker_reset_timeout = reset_timeout
+
+
+async def _soak(
+    hass: HomeAssistant, api: StandInApi, args: argparse.Namespace
+) -> dict:
+    entry = await setup_entry(hass, api)
+    data = hass.data[DOMAIN][entry.entry_id]
+    hub = data["hub"]
+    coordinators = data["coordinators"]
+    zone_ids = list(api.zones)
+    entities = _available_entities(hass, entry.entry_id)
+    # The server device stays, the last one leaves and comes back
+    churn = None
+    if len(api.devices) > 1 and args.churn_every:
+        churn = list(api.devices)[-1]
+    left = False
+
+    tracemalloc.start()
+    baseline = _sample(0)
+    samples = []
+    failed_polls = 0
+    failed_commands = 0
+    outages = 0
+    puts = 0
+    start = time.perf_counter()
+    try:
+        for cycle in range(1, args.cycles + 1):
+            if churn is not None and cycle % args.churn_every == 0:
+                if left:
+                    api.restore_device(churn)
+                else:
+                    api.remove_device(churn)
+                left = not left
+                await coordinators[TIER_DEVICES].async_refresh()
+            if args.outage_every:
+                down = (
+                    cycle >= args.outage_every
+                    and cycle % args.outage_every < args.outage_cycles
+                )
+                outages += down and not api.down
+                api.down = down
+            if args.burst_every and cycle % args.burst_every == 0:
+                targets = [zone_id for zone_id in zone_ids if zone_id in api.zones]
+                failed_commands += await _burst(hub, targets, args.burst_size, cycle)
+
+            tiers = [TIER_ZONES]
+            if cycle % args.metrics_every == 0:
+                tiers.append(TIER_METRICS)
+            failed = 0
+            for tier in tiers:
+                await coordinators[tier].async_refresh()
+                failed += not coordinators[tier].last_update_success
+            await hass.async_block_till_done()
+            if failed:
+                failed_polls += failed
+                # A coordinator waits its interval before polling again,
+                # don't spin through cycles that fail fast
+                await asyncio.sleep(args.failure_pause)
+
+            if cycle % args.sample_every == 0:
+                # The stand-in keeps every PUT, don't count that as a leak
+                puts += len(api.puts)
+                api.reset_counters()
+                samples.append(_sample(cycle))
+        elapsed = time.perf_counter() - start
+
+        # Back to a healthy system, everything must show again
+        api.down = False
+        api.error_rate = 0.0
+        if left:
+            api.restore_device(churn)
+        await asyncio.sleep(args.breaker_reset_timeout)
+        for tier in (TIER_DEVICES, TIER_ZONES, TIER_METRICS):
+            await coordinators[tier].async_refresh()
+        await hass.async_block_till_done()
+        samples.append(_sample(args.cycles))
+    finally:
+        tracemalloc.stop()
+
+    violations = _violations(args, baseline, samples)
+    recovered = _available_entities(hass, entry.entry_id)
+    if recovered != entities:
+        violations.append(f"{recovered} of {entities} entities available at the end")
+    if set(hub.openaudios) != set(api.devices):
+        violations.append("the hub devices don't match the API")
+    await hass.config_entries.async_unload(entry.entry_id)
+
+    return {
+        "benchmark": "soak",
+        "standin": standin_options(args),
+        "cycles": args.cycles,
+        "seconds": round(elapsed, 3),
+        "cycles_per_second": round(args.cycles / elapsed, 1) if elapsed else None,
+        "failed_polls": failed_polls,
+        "failed_commands": failed_commands,
+        "outages": outages,
+        "puts": puts + len(api.puts),
+        "entities": entities,
+        "baseline": baseline,
+        "samples": samples,
+        "violations": violations,
+        "client": hub.request_stats.as_dict(),
+    }
+
+
+async def run(args: argparse.Namespace) -> dict:
+    """Run the soak test in a test Home Assistant, return its results"""
+    async with home_assistant() as hass:
+        return await soak(hass, args)
+
+
+def add_soak_arguments(parser: argparse.ArgumentParser) -> None:
+    """Arguments shaping the soak test, defaults sized for a long run"""
+    add_standin_arguments(parser)
+    parser.set_defaults(latency=0.0, jitter=0.0, error_rate=0.01)
+    parser.add_argument("--cycles", type=int, default=20000)
+    parser.add_argument("--metrics-every", type=int, default=10)
+    parser.add_argument(
+        "--churn-every",
+        type=int,
+        default=200,
+        help="cycles between device changes, 0 for none",
+    )
+    parser.add_argument("--burst-every", type=int, default=50)
+    parser.add_argument("--burst-size", type=int, default=20)
+    parser.add_argument(
+        "--outage-every",
+        type=int,
+        default=1000,
+        help="cycles between outages, 0 for none",
+    )
+    parser.add_argument(
+        "--outage-cycles", type=int, default=3, help="cycles an outage lasts"
+    )
+    parser.add_argument("--breaker-reset-timeout", type=float, default=0.5)
+    parser.add_argument(
+        "--failure-pause", type=float, default=0.1, help="seconds after a failed poll"
+    )
+    parser.add_argument("--sample-every", type=int, default=500)
+    parser.add_argument(
+        "--warmup", type=int, default=2000, help="cycles before memory is compared"
+    )
+    parser.add_argument("--max-memory-growth-kb", type=float, default=1024)
+    parser.add_argument("--max-extra-tasks", type=int, default=5)
+    parser.add_argument("--max-extra-sockets", type=int, default=16)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    add_soak_arguments(parser)
+    args = parser.parse_args()
+    results = asyncio.run(run(args))
+    report(results, args.output)
+    sys.exit(1 if results["violations"] else 0)
+
+
+if __name__ == "__main__":
+    main()
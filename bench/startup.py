@@ -0,0 +1,105 @@
+"""Setup time of an OpenAudio config entry
+
+Sets up a config entry against a stand-in API of the given size and
+latency, first as a fresh install and then as a restart that finds the
+topology snapshot. Reports how long Home Assistant waited for the setup,
+the setup timings of the hub and the requests each setup made:
+
+    python -m bench.startup --devices 4 --zones 8 --inputs 4 --latency 0.05
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+from homeassistant.const import CONF_HOST, EVENT_HOMEASSISTANT_FINAL_WRITE
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.openaudio.const import CONF_PUSH_UPDATES, DOMAIN
+from tests.standin import StandInApi
+
+from .common import (
+    add_standin_arguments,
+    home_assistant,
+    report,
+    standin_options,
+    summarize,
+)
+
+
+async def _setup(hass: HomeAssistant, entry: MockConfigEntry, api: StandInApi) -> dict:
+    """Set up entry, return how long it took until the background refresh ended"""
+    api.reset_counters()
+    start = time.perf_counter()
+    if not await hass.config_entries.async_setup(entry.entry_id):
+        raise RuntimeError("setup failed")
+    setup = time.perf_counter() - start
+    hub = hass.data[DOMAIN][entry.entry_id]["hub"]
+    async with asyncio.timeout(60):
+        while "complete" not in hub.setup_timings:
+            await asyncio.sleep(0.001)
+    await hass.async_block_till_done()
+    return {
+        "setup": setup,
+        **hub.setup_timings,
+        "requests": sum(api.requests.values()),
+    }
+
+
+async def _run_once(args: argparse.Namespace) -> dict[str, dict]:
+    """Set up a fresh install, then again from its snapshot"""
+    async with home_assistant() as hass, StandInApi(**standin_options(args)) as api:
+        entry = MockConfigEntry(
+            domain=DOMAIN, data={CONF_HOST: api.host, CONF_PUSH_UPDATES: False}
+        )
+        entry.add_to_hass(hass)
+        fresh = await _setup(hass, entry, api)
+
+        # What a restart does: flush the delayed snapshot save, unload
+        hass.bus.async_fire(EVENT_HOMEASSISTANT_FINAL_WRITE)
+        await hass.async_block_till_done()
+        await hass.config_entries.async_unload(entry.entry_id)
+        restored = await _setup(hass, entry, api)
+        await hass.config_entries.async_unload(entry.entry_id)
+    return {"fresh_install": fresh, "restart": restored}
+
+
+def _summarize_runs(runs: list[dict]) -> dict:
+    """Summaries of the timings, the requests of the first run"""
+    summary = {}
+    for name in runs[0]:
+        if name == "requests":
+            summary[name] = runs[0][name]
+        else:
+            summary[name] = summarize([run[name] for run in runs if name in run])
+    return summary
+
+
+async def run(args: argparse.Namespace) -> dict:
+    """Run the benchmark, return its results"""
+    runs = [await _run_once(args) for _ in range(args.runs)]
+    return {
+        "benchmark": "startup",
+        "standin": standin_options(args),
+        "runs": args.runs,
+        **{
+            kind: _summarize_runs([run[kind] for run in runs])
+            for kind in ("fresh_install", "restart")
+        },
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    add_standin_arguments(parser)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    report(asyncio.run(run(args)), args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,59 @@
 """The OpenAudio integration."""
 from __future__ import annotations
 
+import asyncio
 import async_timeout
+import time
 
+from collections.abc import Callable
 from datetime import timedelta
+from functools import partial
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform, CONF_HOST, CONF_SCAN_INTERVAL
-from homeassistant.core import HomeAssistant
-from homeassistant.exceptions import ConfigEntryAuthFailed
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import ConfigEntryAuthFailed, ConfigEntryNotReady
+from homeassistant.helpers import config_validation as cv, device_registry as dr
+from homeassistant.helpers.debounce import Debouncer
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.typing import ConfigType
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
 
-from .const import DOMAIN, LOGGER
-from .exceptions import UnexpectedException
+from .const import (
+    ACTIVE_SCAN_INTERVAL,
+    ACTIVE_WINDOW,
+    CONF_MAX_CONCURRENT_REQUESTS,
+    CONF_MAX_SCAN_INTERVAL,
+    CONF_PUSH_UPDATES,
+    DEFAULT_MAX_CONCURRENT_REQUESTS,
+    DEFAULT_MAX_SCAN_INTERVAL,
+    DEFAULT_PUSH_UPDATES,
+    DEFAULT_SCAN_INTERVAL,
+    DEVICES_SCAN_INTERVAL,
+    DOMAIN,
+    LOGGER,
+    METRICS_SCAN_INTERVAL,
+    PUSH_SCAN_INTERVAL,
+    SNAPSHOT_SAVE_DELAY,
+    STORAGE_VERSION,
+    TIER_DEVICES,
+    TIER_METRICS,
+    TIER_ZONES,
+)
+from .pyopenaudio import UnexpectedException
 from .hub import OpenAudioHub
+from .push import OpenAudioPushListener
+from .services import async_setup_services
 
 PLATFORMS: list[Platform] = [Platform.SENSOR, Platform.MEDIA_PLAYER]
 
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up the OpenAudio services."""
+    async_setup_services(hass)
+    return True
+
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up OpenAudio from a config entry."""
@@ -23,46 +61,317 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     hub = OpenAudioHub(
         hass,
         entry.data[CONF_HOST],
+        entry.data.get(CONF_MAX_CONCURRENT_REQUESTS, DEFAULT_MAX_CONCURRENT_REQUESTS),
     )
 
     if not await hub.verify_connection():
         return False
 
-    await hub.initialize()
+    scan_interval = entry.data.get(CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL)
+    coordinators = {
+        TIER_ZONES: OpenAudioUpdateCoordinator(
+            hass,
+            hub,
+            TIER_ZONES,
+            scan_interval,
+            max(scan_interval, entry.data.get(CONF_MAX_SCAN_INTERVAL, DEFAULT_MAX_SCAN_INTERVAL)),
+        ),
+        TIER_METRICS: OpenAudioUpdateCoordinator(
+            hass, hub, TIER_METRICS, max(scan_interval, METRICS_SCAN_INTERVAL)
+        ),
+        TIER_DEVICES: OpenAudioUpdateCoordinator(
+            hass, hub, TIER_DEVICES, max(scan_interval, DEVICES_SCAN_INTERVAL)
+        ),
+    }
+
+    # Only what the entities are created from is awaited, the rest of the
+    # data follows in the background once the platforms are set up
+    setup_start = time.monotonic()
+    store = OpenAudioSnapshotStore(hass, entry.entry_id)
+    snapshot = await store.async_load()
+    # The last known topology, live data replaces it shortly. One this
+    # version can't read is fetched anew, as on a fresh install.
+    if snapshot is not None and not hub.restore_snapshot(snapshot):
+        snapshot = None
+    if snapshot is None:
+        try:
+            await hub.fetch_topology()
+        except Exception as err:
+            # Setup will be retried with a fresh hub, don't leak the session
+            await hub.async_close()
+            if isinstance(err, (UnexpectedException, asyncio.TimeoutError)):
+                raise ConfigEntryNotReady(f"Error communicating with API: {err}") from err
+            raise
+        # A fresh install has no snapshot yet, the next start needs one
+        store.async_delay_save(hub.as_snapshot, SNAPSHOT_SAVE_DELAY)
+
+    @callback
+    def _async_save_snapshot() -> None:
+        """Save the topology once a poll brought something new"""
+        for coordinator in (coordinators[TIER_DEVICES], coordinators[TIER_ZONES]):
+            if coordinator.last_update_success and coordinator.data and any(coordinator.data):
+                store.async_delay_save(hub.as_snapshot, SNAPSHOT_SAVE_DELAY)
+                return
+
+    for tier in (TIER_DEVICES, TIER_ZONES):
+        entry.async_on_unload(coordinators[tier].async_add_listener(_async_save_snapshot))
+
+    @callback
+    def _async_update_device_registry() -> None:
+        """Keep device names and firmware versions current"""
+        changes = coordinators[TIER_DEVICES].data
+        if not changes:
+            return
+        device_registry = dr.async_get(hass)
+        for device_id in changes.devices:
+            device_info = hub.openaudios[device_id].device_info
+            device = device_registry.async_get_device(
+                identifiers=device_info["identifiers"]
+            )
+            if device is not None:
+                device_registry.async_update_device(
+                    device.id,
+                    name=device_info["name"],
+                    sw_version=device_info["sw_version"],
+                )
+
+    # Also keeps the slow tier polling, it has no entity subscribed to it
+    entry.async_on_unload(
+        coordinators[TIER_DEVICES].async_add_listener(_async_update_device_registry)
+    )
+    entry.async_on_unload(
+        hub.async_add_activity_listener(coordinators[TIER_ZONES].async_note_activity)
+    )
+
+    push = None
+    if entry.data.get(CONF_PUSH_UPDATES, DEFAULT_PUSH_UPDATES):
+        push = OpenAudioPushListener(
+            hass, hub, coordinators[TIER_ZONES], coordinators[TIER_DEVICES]
+        )
 
-    coordinator = OpenAudioUpdateCoordinator(hass, hub, entry.data[CONF_SCAN_INTERVAL] if CONF_SCAN_INTERVAL in entry.data else 30)
     hass.data.setdefault(DOMAIN, {})
-    hass.data[DOMAIN][entry.entry_id] = {"hub": hub, "coordinator": coordinator}
+    hass.data[DOMAIN][entry.entry_id] = {"hub": hub, "coordinators": coordinators, "push": push}
 
-    await coordinator.async_config_entry_first_refresh()
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    hub.setup_timings["entities_ready"] = time.monotonic() - setup_start
+    LOGGER.debug(
+        "OpenAudio entities of %s ready in %.3f seconds",
+        entry.title,
+        hub.setup_timings["entities_ready"],
+    )
+
+    entry.async_create_background_task(
+        hass,
+        _async_background_refresh(hub, coordinators, snapshot is not None, setup_start),
+        "openaudio first refresh",
+    )
+
+    if push is not None:
+        push.async_start(entry)
 
     return True
 
 
+async def _async_background_refresh(
+    hub: OpenAudioHub,
+    coordinators: dict[str, OpenAudioUpdateCoordinator],
+    restored: bool,
+    setup_start: float,
+) -> None:
+    """Fetch what the setup deferred
+
+    Metrics and connection info, and everything else when the topology
+    was restored from a snapshot. The tiers are
+    refreshed together. Failures make the entities unavailable and are
+    retried by the regular polls.
+    """
+    if restored:
+        try:
+            await hub.initialize()
+        except UnexpectedException as err:
+            LOGGER.debug("OpenAudio server device not refreshed: %s", err)
+    await asyncio.gather(
+        *(coordinator.async_refresh() for coordinator in coordinators.values())
+    )
+    hub.setup_timings["complete"] = time.monotonic() - setup_start
+
+
+async def async_remove_config_entry_device(
+    hass: HomeAssistant, entry: ConfigEntry, device_entry: dr.DeviceEntry
+) -> bool:
+    """Let the user delete a device the system no longer reports
+
+    A device missing from a poll may only be rebooting, its registry
+    entries are never removed automatically.
+    """
+    hub = hass.data[DOMAIN][entry.entry_id]["hub"]
+    return not any(
+        not device_entry.identifiers.isdisjoint(amp.device_info["identifiers"])
+        for amp in hub.openaudios.values()
+    )
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the snapshot of a config entry."""
+    await OpenAudioSnapshotStore(hass, entry.entry_id).async_remove()
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
-        hass.data[DOMAIN].pop(entry.entry_id)
+        data = hass.data[DOMAIN].pop(entry.entry_id)
+        if data["push"] is not None:
+            await data["push"].async_stop()
+        await data["hub"].async_close()
 
     return unload_ok
 
 
+class OpenAudioSnapshotStore(Store):
+    """Topology snapshot of a config entry, see OpenAudioHub.as_snapshot"""
+
+    def __init__(self, hass: HomeAssistant, entry_id: str) -> None:
+        super().__init__(hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}")
+
+    async def _async_migrate_func(
+        self, old_major_version: int, old_minor_version: int, old_data: dict
+    ) -> dict | None:
+        """Convert a snapshot saved by another STORAGE_VERSION
+
+        When the snapshot format changes, bump STORAGE_VERSION and convert
+        the older versions here. A version without a conversion, e.g. one
+        saved by a newer release before a downgrade, is dropped: the
+        snapshot only spares the setup a fetch.
+        """
+        LOGGER.info(
+            "OpenAudio snapshot %s.%s dropped, the topology is fetched anew",
+            old_major_version,
+            old_minor_version,
+        )
+        return None
+
+
 class OpenAudioUpdateCoordinator(DataUpdateCoordinator):
-    """OpenAudio data update coordinator."""
+    """OpenAudio data update coordinator for one refresh tier."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        hub: OpenAudioHub,
+        tier: str,
+        update_interval: int,
+        max_update_interval: int | None = None,
+    ) -> None:
+        """Initialize my coordinator.
 
-    def __init__(self, hass: HomeAssistant, hub: OpenAudioHub, update_interval: int) -> None:
-        """Initialize my coordinator."""
+        With a max_update_interval the interval adapts to activity, see
+        _async_adapt_interval.
+        """
         super().__init__(
             hass,
             LOGGER,
             # Name of the data. For logging purposes.
-            name="OpenAudio Coordinator",
+            name=f"OpenAudio {tier} Coordinator",
             # Polling interval. Will only be polled if there are subscribers.
             update_interval=timedelta(seconds=update_interval),
         )
-        LOGGER.debug("OpenAudio data update interval: %s seconds", update_interval)
+        LOGGER.debug("OpenAudio %s update interval: %s seconds", tier, update_interval)
         self._hub = hub
+        self.tier = tier
+        self._base_interval = timedelta(seconds=update_interval)
+        self._max_interval = (
+            timedelta(seconds=max_update_interval) if max_update_interval else None
+        )
+        self._idle_interval = self._base_interval
+        self._active_until = 0.0
+        self._push_connected = False
+        self._interval_listeners: list[Callable[[], None]] = []
+        # Confirms a burst of commands with one poll once it settled
+        self._activity_refresh = Debouncer(
+            hass,
+            LOGGER,
+            cooldown=ACTIVE_SCAN_INTERVAL,
+            immediate=False,
+            function=self.async_refresh,
+        )
+
+    @callback
+    def async_add_interval_listener(self, listener: Callable[[], None]) -> Callable[[], None]:
+        """Call listener whenever update_interval changes, return a remover
+
+        The interval also changes between refreshes, e.g. on a command or
+        when the push channel connects, without updating the listeners.
+        """
+        self._interval_listeners.append(listener)
+        return partial(self._interval_listeners.remove, listener)
+
+    @callback
+    def async_note_activity(self) -> None:
+        """Poll fast for a while, e.g. after a command"""
+        if self._max_interval is None:
+            return
+        self._async_adapt_interval(changed=True)
+        # Bring the next poll forward instead of waiting out a long idle
+        # interval, the commands were applied optimistically
+        self._activity_refresh.async_schedule_call()
+
+    async def async_shutdown(self) -> None:
+        await super().async_shutdown()
+        self._activity_refresh.async_shutdown()
+
+    @callback
+    def async_set_push_connected(self, connected: bool) -> None:
+        """Only poll as a safety net while pushed events arrive"""
+        self._push_connected = connected
+        if not connected:
+            # Polls are the only source again, back off from the start
+            self._idle_interval = self._base_interval
+        self._async_adapt_interval()
+
+    @callback
+    def _async_adapt_interval(self, changed: bool = False) -> None:
+        """Pick the interval of the next poll
+
+        A change (or a command) keeps the interval at ACTIVE_SCAN_INTERVAL for
+        ACTIVE_WINDOW seconds. After that every poll that finds nothing new
+        doubles the interval, up to the max update interval.
+        """
+        if self._push_connected:
+            self._async_set_interval(timedelta(seconds=PUSH_SCAN_INTERVAL))
+            return
+        if self._max_interval is None:
+            self._async_set_interval(self._base_interval)
+            return
+
+        now = time.monotonic()
+        if changed:
+            self._active_until = now + ACTIVE_WINDOW
+            self._idle_interval = self._base_interval
+
+        if now < self._active_until:
+            self._async_set_interval(
+                min(self._base_interval, timedelta(seconds=ACTIVE_SCAN_INTERVAL))
+            )
+        else:
+            self._async_set_interval(self._idle_interval)
+            self._idle_interval = min(self._idle_interval * 2, self._max_interval)
+
+    @callback
+    def _async_set_interval(self, interval: timedelta) -> None:
+        if interval == self.update_interval:
+            return
+        self.update_interval = interval
+        for listener in list(self._interval_listeners):
+            listener()
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Update all registered listeners, counting the states written"""
+        entity_writes = self._hub.entity_writes
+        super().async_update_listeners()
+        self._hub.poll_stats[self.tier].last_entity_writes = (
+            self._hub.entity_writes - entity_writes
+        )
 
     async def _async_update_data(self):
         """Fetch data from API endpoint.
@@ -74,6 +383,12 @@ class OpenAudioUpdateCoordinator(DataUpdateCoordinator):
             # Note: asyncio.TimeoutError and aiohttp.ClientError are already
             # handled by the data update coordinator.
             async with async_timeout.timeout(60):
-                return await self._hub.fetch_data()
+                changes = await self._hub.fetch_tier(self.tier)
         except UnexpectedException as err:
             raise UpdateFailed(f"Error communicating with API: {err}") from err
+
+        if self._max_interval is not None:
+            self._async_adapt_interval(
+                changed=changes is not None and any(changes)
+            )
+        return changes
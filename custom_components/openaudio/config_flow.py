@@ -14,15 +14,32 @@ from homeassistant.core import HomeAssistant
 from homeassistant.data_entry_flow import FlowResult
 from homeassistant.exceptions import HomeAssistantError
 
-from .const import DOMAIN, LOGGER
+from .const import (
+    CONF_MAX_CONCURRENT_REQUESTS,
+    CONF_MAX_SCAN_INTERVAL,
+    CONF_PUSH_UPDATES,
+    DEFAULT_MAX_CONCURRENT_REQUESTS,
+    DEFAULT_MAX_SCAN_INTERVAL,
+    DEFAULT_PUSH_UPDATES,
+    DEFAULT_SCAN_INTERVAL,
+    DOMAIN,
+    LOGGER,
+)
 from .hub import OpenAudioHub
-from .exceptions import UnexpectedException
+from .pyopenaudio import UnexpectedException
 
 # TODO adjust the data schema to the data that you need
 STEP_USER_DATA_SCHEMA = vol.Schema(
     {
         vol.Required(CONF_HOST, default=""): str,
-        vol.Required(CONF_SCAN_INTERVAL, default=30): int
+        vol.Required(CONF_SCAN_INTERVAL, default=DEFAULT_SCAN_INTERVAL): int,
+        vol.Optional(
+            CONF_MAX_CONCURRENT_REQUESTS, default=DEFAULT_MAX_CONCURRENT_REQUESTS
+        ): vol.All(int, vol.Range(min=1, max=16)),
+        vol.Optional(CONF_PUSH_UPDATES, default=DEFAULT_PUSH_UPDATES): bool,
+        vol.Optional(
+            CONF_MAX_SCAN_INTERVAL, default=DEFAULT_MAX_SCAN_INTERVAL
+        ): vol.All(int, vol.Range(min=1)),
     }
 )
 
@@ -55,7 +72,10 @@ async def validate_input(hass: HomeAssistant, data: dict[str, Any]):
         raise CannotConnect
 
     LOGGER.debug("Successfully reached the OpenAudio amplifier on the network")
-    return await hub.get_devices()
+    try:
+        return await hub.get_devices()
+    finally:
+        await hub.async_close()
 
 
 class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
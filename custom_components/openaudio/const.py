@@ -3,3 +3,67 @@ from logging import Logger, getLogger
 
 DOMAIN = "openaudio"
 LOGGER: Logger = getLogger(__package__)
+
+CONF_MAX_CONCURRENT_REQUESTS = "max_concurrent_requests"
+CONF_PUSH_UPDATES = "push_updates"
+CONF_MAX_SCAN_INTERVAL = "max_scan_interval"
+
+DEFAULT_SCAN_INTERVAL = 30
+DEFAULT_MAX_CONCURRENT_REQUESTS = 4
+# The event channel is not in every firmware, push is opt-in
+DEFAULT_PUSH_UPDATES = False
+DEFAULT_MAX_SCAN_INTERVAL = 300
+
+# Per-input configs (name, available types, class) rarely change, they are
+# refetched after this many seconds or when a command or /inputs/info says so
+INPUT_CONFIG_TTL = 900
+INPUT_CONFIG_CACHE_SIZE = 256
+
+SERVICE_APPLY_ZONES = "apply_zones"
+SERVICE_PROFILE = "profile"
+
+ATTR_ZONES = "zones"
+ATTR_ZONE_ID = "zone_id"
+ATTR_VOLUME = "volume"
+ATTR_INPUT = "input"
+ATTR_COUNT = "count"
+ATTR_CPROFILE = "cprofile"
+ATTR_TRACEMALLOC = "tracemalloc"
+ATTR_TOP = "top"
+
+# While the event channel is up polling is only a safety net
+PUSH_SCAN_INTERVAL = 300
+PUSH_RECONNECT_MIN_DELAY = 5
+PUSH_RECONNECT_MAX_DELAY = 300
+
+# The last known topology and state is stored per config entry, so
+# entities exist right away on the next start. Bump the version when the
+# snapshot format changes, see OpenAudioSnapshotStore
+STORAGE_VERSION = 1
+SNAPSHOT_SAVE_DELAY = 60
+
+# Refresh tiers, each with its own coordinator and interval
+TIER_ZONES = "zones"
+TIER_METRICS = "metrics"
+TIER_DEVICES = "devices"
+
+METRICS_SCAN_INTERVAL = 120
+DEVICES_SCAN_INTERVAL = 900
+
+# Sections of the data whose age is tracked, metrics are tracked per device
+# as "metrics/<device_id>"
+SECTION_ZONES = "zones"
+SECTION_INPUTS = "inputs"
+SECTION_DEVICES = "devices"
+SECTION_METRICS = "metrics"
+
+# Seconds the requests of one poll get together. Each request times out
+# after what is left of it, so one endpoint that hangs doesn't use up the
+# coordinator's timeout and the sections that arrived are kept.
+POLL_BUDGET = 45
+
+# After a command or a detected change the zones tier polls every
+# ACTIVE_SCAN_INTERVAL seconds for ACTIVE_WINDOW seconds, then backs off
+# exponentially towards the max scan interval while nothing changes
+ACTIVE_SCAN_INTERVAL = 5
+ACTIVE_WINDOW = 60
@@ -0,0 +1,50 @@
+"""Diagnostics support for OpenAudio."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_HOST
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+
+TO_REDACT = {CONF_HOST}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    data = hass.data[DOMAIN][entry.entry_id]
+    hub = data["hub"]
+    push = data["push"]
+
+    return {
+        "entry": async_redact_data(entry.as_dict(), TO_REDACT),
+        "push_connected": push is not None and push.connected,
+        "coordinators": {
+            tier: {
+                "update_interval": (
+                    coordinator.update_interval.total_seconds()
+                    if coordinator.update_interval is not None
+                    else None
+                ),
+                "last_update_success": coordinator.last_update_success,
+            }
+            for tier, coordinator in data["coordinators"].items()
+        },
+        "setup": hub.setup_timings,
+        "polls": {tier: stats.as_dict() for tier, stats in hub.poll_stats.items()},
+        "requests": hub.request_stats.as_dict(),
+        # The client keys its breakers by host, which is redacted
+        "circuit_breakers": {"hub": hub.breaker_state()},
+        "sections": hub.freshness.as_dict(),
+        "entity_writes": hub.entity_writes,
+        "suppressed_writes": hub.suppressed_writes,
+        "topology": {
+            device_id: {"zones": list(zone_ids), "inputs": list(input_ids)}
+            for device_id, (zone_ids, input_ids) in hub.topology.devices.items()
+        },
+    }
@@ -0,0 +1,165 @@
+"""Entity helpers for OpenAudio"""
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable
+from functools import partial
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.entity import DeviceInfo, Entity
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.update_coordinator import (
+    CoordinatorEntity,
+    DataUpdateCoordinator,
+)
+
+from .hub import OpenAudioChanges, OpenAudioDevice, SectionFreshness
+
+
+@callback
+def async_track_entities(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    coordinators: Iterable[DataUpdateCoordinator],
+    async_add_entities: AddEntitiesCallback,
+    describe: Callable[[], dict[str, Callable[[], Entity]]],
+) -> None:
+    """Keep the entities of a platform in line with the topology
+
+    describe returns a factory for every entity the current topology
+    needs, keyed by a stable id. Whenever a refresh of one of coordinators
+    reports a topology change, entities that are no longer described are
+    removed and the new ones added, without reloading the config entry.
+    Removed entities keep their registry entries, a device that is gone
+    for good is deleted by the user, see async_remove_config_entry_device.
+    Entities whose _exists went False while their key is still described,
+    e.g. of a device that left and came back in between, are replaced.
+    """
+    entities: dict[str, Entity] = {}
+    # Keys whose entity is being removed before it is added again
+    replacing: set[str] = set()
+
+    async def _async_replace(stale: dict[str, Entity]) -> None:
+        for entity in stale.values():
+            if entity.hass is not None:
+                # The registry entry is kept for the entity that replaces it
+                await entity.async_remove(force_remove=True)
+        replacing.difference_update(stale)
+        _async_sync()
+
+    @callback
+    def _async_sync() -> None:
+        wanted = describe()
+        for key in entities.keys() - wanted.keys():
+            entity = entities.pop(key)
+            if entity.hass is not None:
+                # Shown unavailable, the registry entry keeps the user's
+                # name, area and automations for when the device is back
+                hass.async_create_task(entity.async_remove())
+
+        stale = [key for key in entities.keys() & wanted.keys() if not entities[key]._exists]
+        if stale:
+            replacing.update(stale)
+            hass.async_create_task(
+                _async_replace({key: entities.pop(key) for key in stale})
+            )
+
+        new_entities = []
+        for key, create in wanted.items():
+            if key not in entities and key not in replacing:
+                entities[key] = create()
+                new_entities.append(entities[key])
+        if new_entities:
+            async_add_entities(new_entities)
+
+    @callback
+    def _async_reconcile(coordinator: DataUpdateCoordinator) -> None:
+        changes: OpenAudioChanges | None = coordinator.data
+        if changes is not None and changes.topology:
+            _async_sync()
+
+    _async_sync()
+    for coordinator in coordinators:
+        config_entry.async_on_unload(
+            coordinator.async_add_listener(partial(_async_reconcile, coordinator))
+        )
+
+
+def stale_attributes(freshness: SectionFreshness, sections) -> dict | None:
+    """Attributes that flag data of sections that could not be refreshed
+
+    None while every section is fresh. data_age is the age in seconds of
+    the oldest stale section.
+    """
+    stale = [section for section in sections if section in freshness.stale]
+    if not stale:
+        return None
+    ages = [age for section in stale if (age := freshness.age(section)) is not None]
+    return {"stale": True, "data_age": round(max(ages)) if ages else None}
+
+
+class OpenAudioEntity(CoordinatorEntity):
+    """Base class of the entities showing data of a device
+
+    A refresh only writes the state when it changed data the entity shows,
+    see _is_changed, or when its availability or staleness changed.
+    """
+
+    _attr_has_entity_name = True
+
+    def __init__(self, amp: OpenAudioDevice, coordinator, config_entry) -> None:
+        super().__init__(coordinator)
+        self._amp = amp
+        self._config_entry = config_entry
+        # Availability and staleness last written
+        self._last_shown = None
+
+    @property
+    def device_info(self) -> DeviceInfo:
+        return self._amp.device_info
+
+    @property
+    def _sections(self) -> tuple[str, ...]:
+        """Sections of the hub data the entity shows"""
+        return ()
+
+    def _is_changed(self, changes: OpenAudioChanges) -> bool:
+        """Return True if the poll changed data this entity shows"""
+        return True
+
+    @property
+    def _exists(self) -> bool:
+        """Return False once the data is no longer reported"""
+        return self._amp.is_current
+
+    @property
+    def _stale_attributes(self) -> dict | None:
+        return stale_attributes(self._amp.hub.freshness, self._sections)
+
+    @property
+    def extra_state_attributes(self):
+        """Flag data that could not be refreshed"""
+        return self._stale_attributes
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        if not self._exists:
+            # Removed by the platform, see async_track_entities
+            return
+        changes: OpenAudioChanges | None = self.coordinator.data
+        shown = (self.available, self._stale_attributes is not None)
+        if (
+            changes is not None
+            and shown == self._last_shown
+            and not self._is_changed(changes)
+        ):
+            self._amp.hub.suppressed_writes += 1
+            return
+        self._last_shown = shown
+        self._async_write_state()
+
+    @callback
+    def _async_write_state(self) -> None:
+        """Write the state, counted in the entity writes of the hub"""
+        self._amp.hub.entity_writes += 1
+        self.async_write_ha_state()
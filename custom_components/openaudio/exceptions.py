@@ -1,5 +0,0 @@
-"""Exceptions"""
-
-
-class UnexpectedException(Exception):
-    """Unexpected error"""
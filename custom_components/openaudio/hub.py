@@ -1,10 +1,44 @@
 """Hub for OpenAudio"""
+from __future__ import annotations
+
+import asyncio
+import time
+
+from collections import ChainMap, Counter, OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from functools import partial
+from typing import Any, NamedTuple
+
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity import DeviceInfo
 
-from .openaudio import OpenAudioClient
+from .models import InputRecord, SourceCatalog, ZoneRecord, device_info_from_json
+from .pyopenaudio import (
+    LatencyHistogram,
+    OpenAudioClient,
+    RequestStats,
+    UnexpectedException,
+    request_deadline,
+)
+from .profiler import OpenAudioProfiler
 
-from .const import DOMAIN, LOGGER
+from .const import (
+    ATTR_INPUT,
+    ATTR_VOLUME,
+    ATTR_ZONE_ID,
+    DEFAULT_MAX_CONCURRENT_REQUESTS,
+    INPUT_CONFIG_CACHE_SIZE,
+    INPUT_CONFIG_TTL,
+    LOGGER,
+    POLL_BUDGET,
+    SECTION_DEVICES,
+    SECTION_INPUTS,
+    SECTION_METRICS,
+    SECTION_ZONES,
+    TIER_DEVICES,
+    TIER_METRICS,
+    TIER_ZONES,
+)
 
 
 class OpenAudioHub:
@@ -14,23 +48,82 @@ class OpenAudioHub:
         self,
         hass: HomeAssistant,
         ip_address: str,
+        max_concurrent_requests: int = DEFAULT_MAX_CONCURRENT_REQUESTS,
     ) -> None:
         self._hass = hass
         self._ip_address = ip_address
+        self._max_concurrent_requests = max_concurrent_requests
         self.openaudios = {}
         self.group_inputs = {}
+        # Published anew whenever group_inputs changes
+        self.sources = SourceCatalog()
         self.client = None
+        # Outlives the clients, a reconnect keeps counting
+        self.request_stats = RequestStats()
+        # Entity writes skipped because their data did not change, and done
+        self.suppressed_writes = 0
+        self.entity_writes = 0
+        # Seconds each stage of the setup took, see fetch_topology
+        self.setup_timings: dict[str, float] = {}
+        # Set while the openaudio.profile service is running
+        self.profiler: OpenAudioProfiler | None = None
+        self.poll_stats = {
+            tier: PollStats() for tier in (TIER_ZONES, TIER_METRICS, TIER_DEVICES)
+        }
+        self._input_configs = InputConfigCache(INPUT_CONFIG_TTL)
+        self._volume_coalescer = LatestValueCoalescer()
+        # Commands not yet answered, by zone
+        self._zone_commands: Counter[str] = Counter()
+        self._activity_listeners: list[Callable[[], None]] = []
+        self._inputs_info = None
         self._server_device_id = None
+        self._closed = False
+        # Which device owns which zone and input
+        self.topology = TopologyIndex()
+        # Age of every section, polls that fail in part serve the rest stale
+        self.freshness = SectionFreshness()
+        # Inputs of every device, zones may play an input of another amp
+        self.input_records: ChainMap[str, InputRecord] = ChainMap()
+
+    @property
+    def server_device(self) -> OpenAudioDevice | None:
+        """Return the device serving the API, or the first one known"""
+        amp = self.openaudios.get(self._server_device_id)
+        if amp is None and self.openaudios:
+            amp = next(iter(self.openaudios.values()))
+        return amp
+
+    def breaker_state(self) -> dict | None:
+        """State of the circuit breaker of the host, None before any request"""
+        if self.client is None:
+            return None
+        return self.client.breaker_states().get(self._ip_address)
 
     async def verify_connection(self) -> bool:
         """Test if we can connect to the host."""
-        client = OpenAudioClient()
+        # One client per hub, its pooled session is opened on the first
+        # request (initialize) and reused until async_close.
+        client = OpenAudioClient(
+            connections_per_host=self._max_concurrent_requests,
+            stats=self.request_stats,
+        )
         if await client.can_connect_to_openaudio(self._ip_address):
             self.client = client
             return True
         else:
+            await client.close()
             return False
 
+    async def async_close(self) -> None:
+        """Release the client session and stop pending commands"""
+        self._closed = True
+        if self.profiler is not None:
+            self.profiler.async_stop()
+        await self._volume_coalescer.async_shutdown()
+        if self.client is not None:
+            await self.client.close()
+            self.client = None
+
     async def get_devices(self):
         """Test if we can authenticate to the host."""
         return await self.client.get_devices(self._ip_address)
@@ -49,7 +142,19 @@ class OpenAudioHub:
     async def _get_devices_info(self):
         """Get devices info"""
         return await self.client.get_devices_info(
-            self._ip_address
+            self._ip_address, only_if_changed=True
+        )
+
+    async def _get_device_metrics(self, device_id: str):
+        """Get device metrics"""
+        return await self.client.get_device_metrics(
+            self._ip_address, device_id
+        )
+
+    async def _get_device_connection(self, device_id: str):
+        """Get device connection info"""
+        return await self.client.get_device_connection_info(
+            self._ip_address, device_id
         )
 
     async def _get_zones_ids(self):
@@ -59,7 +164,9 @@ class OpenAudioHub:
     
     async def _get_zones_info(self):
         """Get zones"""
-        zones = await self.client.get_zones_info(self._ip_address)
+        zones = await self.client.get_zones_info(
+            self._ip_address, only_if_changed=True
+        )
         return zones
 
     async def _get_zone_config(self, zone_id: str):
@@ -70,15 +177,48 @@ class OpenAudioHub:
 
     async def set_zone_input(self, zone_id: str, input):
         """Set zone inputs"""
-        return await self.client.set_zone_input(
-            self._ip_address, zone_id, input
-        )
+        self._zone_commands[zone_id] += 1
+        try:
+            return await self.client.set_zone_input(
+                self._ip_address, zone_id, input
+            )
+        finally:
+            self._zone_command_done(zone_id)
+            self._command_sent()
     
     async def set_zone_volume(self,zone_id: str, volume: int):
         """Set zone volume"""
-        return await self.client.set_zone_volume(
-            self._ip_address, zone_id, volume
-        )
+        self._zone_commands[zone_id] += 1
+        try:
+            return await self._volume_coalescer.async_submit(
+                ("zone", zone_id), volume, partial(self._send_zone_volume, zone_id)
+            )
+        finally:
+            self._zone_command_done(zone_id)
+
+    def _zone_command_done(self, zone_id: str) -> None:
+        self._zone_commands[zone_id] -= 1
+        if not self._zone_commands[zone_id]:
+            del self._zone_commands[zone_id]
+
+    def _settled_zone(self, zone_id: str) -> ZoneRecord | None:
+        """The zone as the device reported it, None if unknown
+
+        A zone with a command in flight may show an optimistic value.
+        """
+        if zone_id in self._zone_commands:
+            return None
+        amp = self.openaudios.get(self.topology.zones.get(zone_id))
+        return None if amp is None else amp.zones.get(zone_id)
+
+    async def _send_zone_volume(self, zone_id: str, volume: int):
+        """Send a zone volume PUT"""
+        try:
+            return await self.client.set_zone_volume(
+                self._ip_address, zone_id, volume
+            )
+        finally:
+            self._command_sent()
 
     async def _get_input_ids(self):
         """Get inputs"""
@@ -87,7 +227,9 @@ class OpenAudioHub:
     
     async def _get_input_info(self):
         """Get inputs"""
-        inputs = await self.client.get_inputs_info(self._ip_address)
+        inputs = await self.client.get_inputs_info(
+            self._ip_address, only_if_changed=True
+        )
         return inputs
 
     async def _get_input_config(self, input_id: str):
@@ -104,106 +246,986 @@ class OpenAudioHub:
     
     async def set_input_type(self, input_id: str, type: str):
         """Set input type"""
-        return await self.client.set_input_type(
-            self._ip_address, input_id, type
-        )
+        try:
+            return await self.client.set_input_type(
+                self._ip_address, input_id, type
+            )
+        finally:
+            self._command_sent(input_id)
 
     async def set_input_volume(self, input_id: str, volume: int):
         """Set the volume for a specific input (0-100)."""
-        return await self.client.set_input_volume(
-            self._ip_address, input_id, volume
+        return await self._volume_coalescer.async_submit(
+            ("input", input_id), volume, partial(self._send_input_volume, input_id)
         )
 
+    async def _send_input_volume(self, input_id: str, volume: int):
+        """Send an input volume PUT"""
+        try:
+            return await self.client.set_input_volume(
+                self._ip_address, input_id, volume
+            )
+        finally:
+            self._command_sent(input_id)
+
     async def set_input_enabled(self, input_id: str, enabled: bool):
         """Enable or disable a specific input."""
-        return await self.client.enable_input(
-            self._ip_address, input_id, enabled
-        )   
+        try:
+            return await self.client.enable_input(
+                self._ip_address, input_id, enabled
+            )
+        finally:
+            self._command_sent(input_id)
 
-    async def fetch_data(self):
+    async def listen_events(self, on_event, on_connect=None) -> None:
+        """Receive pushed events until the channel closes"""
+        if self.client is None:
+            raise UnexpectedException("Not connected")
+        await self.client.listen_events(self._ip_address, on_event, on_connect)
+
+    def apply_event(self, event: dict) -> OpenAudioChanges | None:
+        """Apply a pushed event to the device records
+
+        Events carry the id of a zone, input or device and the fields that
+        changed. Returns what changed, or None when the event can't be
+        applied incrementally and a full refresh is needed.
+        """
+        event_type = event.get("type")
+        data = event.get("data")
+        if not isinstance(data, dict):
+            return None
+
+        # A pushed change must not be masked by an unchanged-looking payload
+        # on the next poll
+        if self.client is not None:
+            self.client.reset_validators()
+
+        if event_type == "zone":
+            zone_id = event.get("zone_id")
+            amp = self.openaudios.get(self.topology.zones.get(zone_id))
+            if amp is not None and zone_id in amp.zones:
+                if amp.merge_zone(zone_id, data):
+                    return OpenAudioChanges(zones=frozenset({zone_id}))
+                return OpenAudioChanges()
+        elif event_type == "input":
+            input_id = event.get("input_id")
+            amp = self.openaudios.get(self.topology.inputs.get(input_id))
+            if amp is not None and input_id in amp.inputs:
+                if amp.merge_input(input_id, data):
+                    # Zones playing the input show its name
+                    zones = set()
+                    for zone_amp in self.openaudios.values():
+                        zones |= zone_amp.refresh_zone_titles({input_id})
+                    return OpenAudioChanges(
+                        zones=frozenset(zones), inputs=frozenset({input_id})
+                    )
+                return OpenAudioChanges()
+        elif event_type == "device":
+            amp = self.openaudios.get(event.get("device_id"))
+            if amp is not None:
+                if amp.merge(data):
+                    return OpenAudioChanges(devices=frozenset({amp.device_id}))
+                return OpenAudioChanges()
+
+        # Unknown event or unknown target, e.g. a zone that was just added
+        return None
+
+    def has_zone(self, zone_id: str) -> bool:
+        """Return True if zone_id belongs to one of the hub's devices"""
+        return zone_id in self.topology.zones
+
+    async def apply_zones(self, targets: list[dict]) -> dict[str, Exception | None]:
+        """Apply volume and input targets to many zones, one target per zone
+
+        Zones are dispatched concurrently, at most max_concurrent_requests at
+        a time. Targets the zone already shows are not sent. Returns the
+        error of every zone, None when it succeeded.
+        """
+        semaphore = asyncio.Semaphore(self._max_concurrent_requests)
+
+        async def apply(target: dict) -> None:
+            zone_id = target[ATTR_ZONE_ID]
+            zone = self._settled_zone(zone_id)
+            commands = []
+            if ATTR_VOLUME in target and (
+                zone is None or zone.raw.get("volume") != target[ATTR_VOLUME]
+            ):
+                commands.append(self.set_zone_volume(zone_id, target[ATTR_VOLUME]))
+            if ATTR_INPUT in target and (
+                zone is None
+                or zone.input_ids != ((target[ATTR_INPUT],) if target[ATTR_INPUT] else ())
+            ):
+                commands.append(self.set_zone_input(zone_id, target[ATTR_INPUT]))
+            async with semaphore:
+                await asyncio.gather(*commands)
+
+        results = await asyncio.gather(
+            *(apply(target) for target in targets), return_exceptions=True
+        )
+        return {
+            target[ATTR_ZONE_ID]: result
+            for target, result in zip(targets, results)
+        }
+
+    def _command_sent(self, input_id: str | None = None) -> None:
+        """Make the next poll read the full payloads
+
+        Entities apply commands optimistically, a payload that looks unchanged
+        must still be processed so an ignored command gets reconciled. The
+        config of an input a command touched is refetched.
+        """
+        if input_id is not None:
+            self._input_configs.invalidate(input_id)
+        if self.client is not None:
+            self.client.reset_validators()
+        for listener in list(self._activity_listeners):
+            listener()
+        if self.profiler is not None:
+            self.profiler.async_note_event()
+
+    def async_add_activity_listener(self, listener: Callable[[], None]) -> Callable[[], None]:
+        """Call listener after every command, returns a function to remove it"""
+        self._activity_listeners.append(listener)
+        return partial(self._activity_listeners.remove, listener)
+
+    async def fetch_data(self) -> OpenAudioChanges | None:
+        """Refresh every tier"""
+        devices = await self.fetch_tier(TIER_DEVICES)
+        if devices is None:
+            return None
+        zones, metrics = await asyncio.gather(
+            self.fetch_tier(TIER_ZONES), self.fetch_tier(TIER_METRICS)
+        )
+        return OpenAudioChanges(
+            devices.devices | metrics.devices,
+            zones.zones,
+            zones.inputs,
+            zones.sources,
+            devices.topology or zones.topology,
+        )
+
+    async def fetch_tier(self, tier: str) -> OpenAudioChanges | None:
+        """Refresh one tier
+
+        zones: zone and input state, polled fast
+        metrics: per-device metrics and connection info, polled less often
+        devices: device topology, config and attributes, polled rarely
+        """
+        if self._closed:
+            # A refresh that was already scheduled when the entry unloaded,
+            # don't open a new session nobody will close
+            raise UnexpectedException("Hub is closed")
         if self.client is None:
             can_connect = await self.verify_connection()
             if not can_connect:
                 LOGGER.error("Could not connect to OpenAudio")
                 return
 
-        return await self._fetch_data_v3()
+        fetch = {
+            TIER_ZONES: self._fetch_zones,
+            TIER_METRICS: self._fetch_metrics,
+            TIER_DEVICES: self._fetch_devices,
+        }[tier]
+        poll_stats = self.poll_stats[tier]
+        start = time.monotonic()
+        try:
+            with request_deadline(POLL_BUDGET):
+                return await fetch()
+        except Exception:
+            poll_stats.failures += 1
+            # Make sure the next poll processes full payloads again
+            self.client.reset_validators()
+            raise
+        finally:
+            poll_stats.add(time.monotonic() - start)
+            if self.profiler is not None:
+                self.profiler.async_note_event()
+
+    async def _fetch_devices(self) -> OpenAudioChanges:
+        """Fetch and process /devices/info
 
-    async def _fetch_data_v3(self):
-        """Get the data from OpenAudio"""
-        devices = await self._get_devices_info()
+        The bulk endpoints are fetched conditionally, a payload that did not
+        change since the last poll comes back as None and is skipped.
+        """
+        try:
+            devices = await self._get_devices_info()
+        except (UnexpectedException, asyncio.TimeoutError):
+            self.freshness.mark_failed(SECTION_DEVICES)
+            raise
+        self.freshness.mark_fresh(SECTION_DEVICES)
         #LOGGER.debug("OpenAudio devices info: %s", devices)
+        if devices is None:
+            return OpenAudioChanges()
+        return self._apply_devices(devices)
+
+    def _apply_devices(self, devices: list[dict]) -> OpenAudioChanges:
+        """Reconcile the devices with a /devices/info payload"""
+        changed_devices = set()
+        new_device = False
+        reported = [device["device_id"] for device in devices]
+        removed = self.openaudios.keys() - set(reported)
+        for device_id in removed:
+            LOGGER.debug("OpenAudioDevice %s is gone", device_id)
+            del self.openaudios[device_id]
+            self.freshness.forget(f"{SECTION_METRICS}/{device_id}")
 
         for device in devices:
             if self.openaudios.get(device["device_id"]) is None:
                 self.openaudios[device["device_id"]] = OpenAudioDevice(self)
                 LOGGER.debug("Initialized OpenAudioDevice for %s", device["device_id"])
-            
-            self.openaudios[device["device_id"]].update(device)
+                new_device = True
 
-        zones = await self._get_zones_info()
-        #LOGGER.debug("OpenAudio zone info: %s", zones)
+            if self.openaudios[device["device_id"]].update(device):
+                changed_devices.add(device["device_id"])
 
-        input_device_id = ""
+        if new_device or removed:
+            self.topology.sync_devices(reported)
+            self.input_records = ChainMap(
+                *(amp.inputs for amp in self.openaudios.values())
+            )
 
-        for z in zones:
-            zone_id_parts = z["zone_id"].split("-")
-            parts_size = len(zone_id_parts)
-            zone_device_id = ""
-            for i in range(parts_size - 1):
-                if i == 0:
-                    zone_device_id = zone_id_parts[i]
-                else:
-                    zone_device_id += "-" + zone_id_parts[i]
-            input_device_id = zone_device_id
-            if self.openaudios.get(zone_device_id) is not None:
-                openaudio = self.openaudios[zone_device_id]
-                openaudio.zones[z["zone_id"]] = z
+        if new_device:
+            # Zones and inputs of the new device may have been skipped
+            # by an earlier poll, have the next poll process them all
+            if self.client is not None:
+                self.client.reset_validators()
+
+        return OpenAudioChanges(
+            devices=frozenset(changed_devices),
+            topology=new_device or bool(removed),
+        )
+
+    async def _fetch_metrics(self) -> OpenAudioChanges:
+        """Fetch and process the metrics and connection info of every device"""
+        amps = list(self.openaudios.values())
+        results = await asyncio.gather(
+            *(self._get_device_metrics(amp.device_id) for amp in amps),
+            *(self._get_device_connection(amp.device_id) for amp in amps),
+            return_exceptions=True,
+        )
+        metrics, connections = results[:len(amps)], results[len(amps):]
+
+        # A device that doesn't answer keeps its last metrics, marked stale,
+        # the poll only fails when no device answered
+        changed_devices = set()
+        errors = []
+        for amp, device_metrics, connection_info in zip(amps, metrics, connections):
+            section = f"{SECTION_METRICS}/{amp.device_id}"
+            if error := _request_error(device_metrics, connection_info):
+                errors.append(error)
+                if self.freshness.mark_failed(section):
+                    changed_devices.add(amp.device_id)
+                continue
+            if self.freshness.mark_fresh(section):
+                changed_devices.add(amp.device_id)
+            if amp.update_metrics(device_metrics, connection_info):
+                changed_devices.add(amp.device_id)
 
+        if errors and len(errors) == len(amps):
+            raise errors[0]
+        return OpenAudioChanges(devices=frozenset(changed_devices))
+
+    async def _fetch_zones(self) -> OpenAudioChanges:
+        """Fetch and process the zones and inputs sections"""
+        # Both bulk endpoints are independent, issue them together.
+        # Concurrency towards the amp is bounded by the client's per-host
+        # connection limit (max_concurrent_requests).
+        zones, inputs = await asyncio.gather(
+            self._get_zones_info(),
+            self._get_input_info(),
+            return_exceptions=True,
+        )
+        # Keep the section that arrived, the other one is served stale
+        zones_error, inputs_error = _request_error(zones), _request_error(inputs)
+        if zones_error and inputs_error:
+            raise zones_error
+        for section, error in ((SECTION_ZONES, zones_error), (SECTION_INPUTS, inputs_error)):
+            if error:
+                LOGGER.warning("OpenAudio %s not refreshed, keeping them: %s", section, error)
+                self.freshness.mark_failed(section)
+            else:
+                self.freshness.mark_fresh(section)
+        if zones_error:
+            zones = None
+        if inputs_error:
+            inputs = None
+
+        changed_zones = set()
+        changed_inputs = set()
+        sources_changed = False
+        topology_changed = False
+
+        #LOGGER.debug("OpenAudio zone info: %s", zones)
+
+        if zones is not None:
+            changed_zones, topology_changed = self._apply_zones(zones)
 
-        inputs = await self._get_input_info()
         #LOGGER.debug("OpenAudio input info: %s", inputs)
 
-        for input_id in inputs["input_ids"]:
-            if self.openaudios.get(input_device_id) is not None:
-                LOGGER.debug("OpenAudio set input: %s", input_id)
-                amp = self.openaudios[input_device_id]
+        inputs_changed = inputs is not None
+        if inputs_changed:
+            self._inputs_info = inputs
+        inputs = self._inputs_info
+
+        if inputs is None or not self.openaudios:
+            LOGGER.debug("OpenAudio inputs are not known yet")
+            return OpenAudioChanges(
+                zones=frozenset(changed_zones), topology=topology_changed
+            )
 
-                input_config = await self._get_input_config(input_id)
+        input_ids = inputs["input_ids"]
+        bulk_inputs = _bulk_input_records(inputs)
+
+        # /inputs/info is the primary source, the per-input config is only
+        # fetched when missing, expired, invalidated by a command or when the
+        # bulk record for the input changed.
+        now = time.monotonic()
+        stale_ids = [
+            input_id
+            for input_id in input_ids
+            if self._input_configs.needs_refresh(input_id, bulk_inputs.get(input_id), now)
+        ]
+        if inputs_changed or stale_ids:
+            input_configs = await asyncio.gather(
+                *(self._get_input_config(input_id) for input_id in stale_ids),
+                return_exceptions=True,
+            )
+            for input_id, input_config in zip(stale_ids, input_configs):
+                if error := _request_error(input_config):
+                    # A cached config is still good enough to show, an
+                    # input never seen can't be set up without one
+                    if not self._input_configs.get(input_id):
+                        raise error
+                    LOGGER.debug("OpenAudio input config of %s kept: %s", input_id, error)
+                    self.freshness.mark_failed(SECTION_INPUTS)
+                    continue
                 LOGGER.debug("OpenAudio input config: %s", input_config)
-                amp.inputs[input_id] = input_config
-                self.group_inputs[input_id] = f"Source {input_id}"
-            else:
-                LOGGER.debug("OpenAudio get input_id is NONE")
+                self._input_configs.put(input_id, input_config, bulk_inputs.get(input_id), now)
+            self._input_configs.retain(input_ids)
+
+            changes = self._apply_inputs(
+                input_ids,
+                {
+                    input_id: {
+                        **self._input_configs.get(input_id),
+                        **bulk_inputs.get(input_id, {}),
+                    }
+                    for input_id in input_ids
+                },
+            )
+            changed_inputs = changes.inputs
+            changed_zones |= changes.zones
+            sources_changed = changes.sources
+            topology_changed |= changes.topology
+
+        return OpenAudioChanges(
+            zones=frozenset(changed_zones),
+            inputs=frozenset(changed_inputs),
+            sources=sources_changed,
+            topology=topology_changed,
+        )
+
+
+    def _apply_zones(self, zones: list[dict]) -> tuple[set[str], bool]:
+        """Reconcile the zones with a /zones/info payload
+
+        Returns the ids of the zones that changed and whether zones were
+        added or removed.
+        """
+        changed_zones = set()
+        topology_changed = False
+        device_zones = self.topology.assign_zones(zones)
+        for device_id, amp in self.openaudios.items():
+            zone_ids = set(amp.zones)
+            changed_zones |= amp.update_zones(device_zones.get(device_id, {}))
+            topology_changed |= zone_ids != amp.zones.keys()
+        return changed_zones, topology_changed
+
+    def _apply_inputs(self, input_ids: list[str], records: dict[str, dict]) -> OpenAudioChanges:
+        """Reconcile the inputs with their merged config and state records"""
+        changed_inputs = set()
+        changed_zones = set()
+        sources_changed = False
+        topology_changed = False
+
+        device_inputs = self.topology.assign_inputs(
+            input_ids, records, self.server_device.device_id
+        )
+        for device_id, amp in self.openaudios.items():
+            amp_input_ids = device_inputs.get(device_id, ())
+            if amp.inputs.keys() != set(amp_input_ids):
+                topology_changed = True
+                amp.retain_inputs(amp_input_ids)
+            for input_id in amp_input_ids:
+                if amp.update_input(input_id, records[input_id]):
+                    changed_inputs.add(input_id)
+        # Follow the inputs the system reports, removed ones included
+        if list(self.group_inputs) != list(input_ids):
+            sources_changed = True
+            self.group_inputs = {
+                input_id: f"Source {input_id}" for input_id in input_ids
+            }
+            self.sources = SourceCatalog.from_input_ids(self.group_inputs)
         #LOGGER.debug("----> group input %s", self.group_inputs)
 
+        # Zones show the name of the input they play
+        if changed_inputs:
+            for zone_amp in self.openaudios.values():
+                changed_zones |= zone_amp.refresh_zone_titles(changed_inputs)
+
+        return OpenAudioChanges(
+            zones=frozenset(changed_zones),
+            inputs=frozenset(changed_inputs),
+            sources=sources_changed,
+            topology=topology_changed,
+        )
+
+    async def fetch_topology(self) -> None:
+        """Fetch what the entities are created from
+
+        The server device, devices, zones and the bulk inputs are requested
+        together, then the configs of the inputs, which hold the names the
+        input entities are created with. Metrics and connection info are
+        left to the first regular poll.
+        """
+        if self.client is None and not await self.verify_connection():
+            raise UnexpectedException("Could not connect to OpenAudio")
+        start = time.monotonic()
+        with request_deadline(POLL_BUDGET):
+            server_device_id, devices, zones, inputs = results = await asyncio.gather(
+                self.client.get_server_device_id(self._ip_address),
+                self._get_devices_info(),
+                self._get_zones_info(),
+                self._get_input_info(),
+                return_exceptions=True,
+            )
+            if not (error := _request_error(*results)) and not devices:
+                # Zones and inputs are set up on devices, there is none yet
+                error = UnexpectedException("No devices reported")
+            if not error:
+                input_ids = inputs["input_ids"]
+                results = input_configs = await asyncio.gather(
+                    *(self._get_input_config(input_id) for input_id in input_ids),
+                    return_exceptions=True,
+                )
+                error = _request_error(*results)
+        if error:
+            self.client.reset_validators()
+            raise error
+
+        self._server_device_id = server_device_id
+        self._apply_devices(devices)
+        self._inputs_info = inputs
+        bulk_inputs = _bulk_input_records(inputs)
+        now = time.monotonic()
+        for input_id, input_config in zip(input_ids, input_configs):
+            self._input_configs.put(input_id, input_config, bulk_inputs.get(input_id), now)
+        self._apply_inputs(
+            input_ids,
+            {
+                input_id: {**input_config, **bulk_inputs.get(input_id, {})}
+                for input_id, input_config in zip(input_ids, input_configs)
+            },
+        )
+        self._apply_zones(zones)
+        for section in (SECTION_DEVICES, SECTION_ZONES, SECTION_INPUTS):
+            self.freshness.mark_fresh(section)
+        self.setup_timings["topology"] = time.monotonic() - start
+
+    def as_snapshot(self) -> dict:
+        """Return the topology and state to restore on the next start"""
+        return {
+            "server_device_id": self._server_device_id,
+            "devices": [amp.raw for amp in self.openaudios.values()],
+            "zones": [
+                record.raw
+                for amp in self.openaudios.values()
+                for record in amp.zones.values()
+            ],
+            "input_ids": list(self.group_inputs),
+            "inputs": {
+                input_id: record.raw
+                for amp in self.openaudios.values()
+                for input_id, record in amp.inputs.items()
+            },
+        }
+
+    def restore_snapshot(self, snapshot: dict) -> bool:
+        """Restore what as_snapshot returned, before the first poll
+
+        The restored sections are marked stale until they are fetched.
+        Returns False, with nothing restored, for a snapshot without
+        devices or one that is truncated or of an older format; the
+        topology must then be fetched.
+        """
+        try:
+            self._server_device_id = snapshot["server_device_id"]
+            self._apply_devices(snapshot["devices"])
+            if not self.openaudios:
+                self._server_device_id = None
+                return False
+            input_ids = [
+                input_id for input_id in snapshot["input_ids"] if input_id in snapshot["inputs"]
+            ]
+            self._apply_inputs(input_ids, snapshot["inputs"])
+            self._apply_zones(snapshot["zones"])
+        except (KeyError, TypeError, ValueError) as err:
+            LOGGER.warning("OpenAudio snapshot discarded, it can't be read: %r", err)
+            self._forget_topology()
+            return False
+        for section in (SECTION_DEVICES, SECTION_ZONES, SECTION_INPUTS):
+            self.freshness.mark_failed(section)
+        return True
+
+    def _forget_topology(self) -> None:
+        """Drop what a snapshot restored in part, as if never restored"""
+        self._server_device_id = None
+        self.openaudios = {}
+        self.group_inputs = {}
+        self.sources = SourceCatalog()
+        self.topology = TopologyIndex()
+        self.freshness = SectionFreshness()
+        self.input_records = ChainMap()
+
+
+class OpenAudioChanges(NamedTuple):
+    """Ids of what changed in a poll, entities outside of it skip their write"""
+
+    devices: frozenset[str] = frozenset()
+    zones: frozenset[str] = frozenset()
+    inputs: frozenset[str] = frozenset()
+    sources: bool = False
+    # Devices, zones or inputs were added or removed
+    topology: bool = False
+
+
+def _request_error(*results) -> Exception | None:
+    """Return the request error among gathered results, if any
+
+    Other exceptions are bugs and raised right away.
+    """
+    for result in results:
+        if isinstance(result, (UnexpectedException, asyncio.TimeoutError)):
+            return result
+        if isinstance(result, BaseException):
+            raise result
+    return None
+
+
+class SectionFreshness:
+    """When each section of the data was last fetched, and which are stale
+
+    A section is stale from the first failed fetch until the next
+    successful one, its data is the one last fetched in the meantime.
+    """
+
+    def __init__(self) -> None:
+        self._fetched_at: dict[str, float] = {}
+        self.stale: set[str] = set()
+
+    def mark_fresh(self, section: str) -> bool:
+        """Record a successful fetch, return True if it was stale"""
+        self._fetched_at[section] = time.monotonic()
+        if section in self.stale:
+            self.stale.discard(section)
+            return True
+        return False
+
+    def mark_failed(self, section: str) -> bool:
+        """Record a failed fetch, return True if it just went stale"""
+        if section in self.stale:
+            return False
+        self.stale.add(section)
+        return True
+
+    def age(self, section: str) -> float | None:
+        """Seconds since section was last fetched"""
+        fetched_at = self._fetched_at.get(section)
+        return time.monotonic() - fetched_at if fetched_at is not None else None
+
+    def forget(self, section: str) -> None:
+        """Forget a section that no longer exists"""
+        self._fetched_at.pop(section, None)
+        self.stale.discard(section)
+
+    def as_dict(self) -> dict:
+        """Return the age and staleness of every section"""
+        return {
+            section: {"age": self.age(section), "stale": section in self.stale}
+            for section in sorted(self._fetched_at.keys() | self.stale)
+        }
+
+
+def _bulk_input_records(inputs) -> dict:
+    """Return the per-input records of an /inputs/info payload keyed by id"""
+    records = inputs.get("inputs")
+    if isinstance(records, dict):
+        return records
+    if isinstance(records, list):
+        return {
+            record["input_id"]: record
+            for record in records
+            if isinstance(record, dict) and "input_id" in record
+        }
+    return {}
+
+
+class PollStats:
+    """Timings of the polls of one tier"""
+
+    __slots__ = ("polls", "failures", "last_duration", "durations", "last_entity_writes")
+
+    def __init__(self) -> None:
+        self.polls = 0
+        self.failures = 0
+        self.last_duration: float | None = None
+        self.durations = LatencyHistogram()
+        # Entity states written after the last poll
+        self.last_entity_writes: int | None = None
+
+    def add(self, duration: float) -> None:
+        """Record the duration of a poll"""
+        self.polls += 1
+        self.last_duration = duration
+        self.durations.add(duration)
+
+    def as_dict(self) -> dict:
+        """Return the timings as a dict"""
+        stats = {name: getattr(self, name) for name in self.__slots__}
+        stats["durations"] = self.durations.as_dict()
+        return stats
+
+
+class TopologyIndex:
+    """Which device owns which zone and input
+
+    The owner of an id is worked out once, from the device_id the API
+    reports with the record, else from the device id prefixing it. Inputs
+    that belong to no device in particular go to the device serving the
+    API. Ids stay indexed until they are no longer reported.
+    """
+
+    def __init__(self) -> None:
+        # id -> device id
+        self.zones: dict[str, str] = {}
+        self.inputs: dict[str, str] = {}
+        # device id -> ids it owns, dicts are used as ordered sets
+        self.devices: dict[str, tuple[dict[str, None], dict[str, None]]] = {}
+
+    def _owner(self, item_id: str, record: dict | None) -> str | None:
+        device_id = record.get("device_id") if record else None
+        if device_id in self.devices:
+            return device_id
+        device_id = item_id.rpartition("-")[0]
+        if device_id in self.devices:
+            return device_id
+        return None
+
+    def sync_devices(self, device_ids) -> None:
+        """Follow the devices the system reports"""
+        for device_id in self.devices.keys() - set(device_ids):
+            zone_ids, input_ids = self.devices.pop(device_id)
+            for zone_id in zone_ids:
+                del self.zones[zone_id]
+            for input_id in input_ids:
+                del self.inputs[input_id]
+        for device_id in device_ids:
+            self.devices.setdefault(device_id, ({}, {}))
+
+    def assign_zones(self, zones: list[dict]) -> dict[str, dict[str, dict]]:
+        """Group a /zones/info payload by device
+
+        Zones of devices that are not known yet are left out.
+        """
+        device_zones: dict[str, dict[str, dict]] = {}
+        for zone in zones:
+            zone_id = zone["zone_id"]
+            device_id = self.zones.get(zone_id)
+            if device_id is None:
+                if (device_id := self._owner(zone_id, zone)) is None:
+                    continue
+                self.zones[zone_id] = device_id
+                self.devices[device_id][0][zone_id] = None
+            device_zones.setdefault(device_id, {})[zone_id] = zone
+
+        for zone_id in self.zones.keys() - {zone["zone_id"] for zone in zones}:
+            del self.devices[self.zones.pop(zone_id)][0][zone_id]
+        return device_zones
+
+    def assign_inputs(
+        self, input_ids, records: dict[str, dict], default_device_id: str
+    ) -> dict[str, list[str]]:
+        """Group the input ids of an /inputs/info payload by device"""
+        device_inputs: dict[str, list[str]] = {}
+        for input_id in input_ids:
+            device_id = self.inputs.get(input_id)
+            if device_id is None:
+                device_id = self._owner(input_id, records.get(input_id))
+                if device_id is None:
+                    device_id = default_device_id
+                self.inputs[input_id] = device_id
+                self.devices[device_id][1][input_id] = None
+            device_inputs.setdefault(device_id, []).append(input_id)
+
+        for input_id in self.inputs.keys() - set(input_ids):
+            del self.devices[self.inputs.pop(input_id)][1][input_id]
+        return device_inputs
+
+
+class InputConfigCache:
+    """LRU cache of per-input configs with a time to live"""
+
+    # Keys of a bulk record that move on their own and don't mean the
+    # input config changed
+    _VOLATILE_KEYS = frozenset({"volume"})
+
+    def __init__(self, ttl: float, max_entries: int = INPUT_CONFIG_CACHE_SIZE) -> None:
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, dict, dict | None]] = OrderedDict()
+
+    @classmethod
+    def _signature(cls, bulk_record: dict | None) -> dict | None:
+        if bulk_record is None:
+            return None
+        return {k: v for k, v in bulk_record.items() if k not in cls._VOLATILE_KEYS}
+
+    def needs_refresh(self, input_id: str, bulk_record: dict | None, now: float) -> bool:
+        """Return True if the config of input_id has to be fetched again"""
+        entry = self._entries.get(input_id)
+        if entry is None:
+            return True
+        fetched_at, _, signature = entry
+        if now - fetched_at > self._ttl:
+            return True
+        return self._signature(bulk_record) != signature
+
+    def get(self, input_id: str) -> dict:
+        """Return the cached config of input_id"""
+        entry = self._entries.get(input_id)
+        if entry is None:
+            return {}
+        self._entries.move_to_end(input_id)
+        return entry[1]
+
+    def put(self, input_id: str, config: dict, bulk_record: dict | None, now: float) -> None:
+        """Store a freshly fetched config"""
+        self._entries[input_id] = (now, config, self._signature(bulk_record))
+        self._entries.move_to_end(input_id)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, input_id: str) -> None:
+        """Force a refetch of input_id on the next poll"""
+        self._entries.pop(input_id, None)
+
+    def retain(self, input_ids) -> None:
+        """Evict inputs the device no longer reports"""
+        for input_id in self._entries.keys() - set(input_ids):
+            del self._entries[input_id]
+
+
+class LatestValueCoalescer:
+    """Send only the newest value per target while a command is in flight
+
+    A slider drag fires many volume commands. While one PUT is in flight for
+    a target, newer values replace the pending one, so at most one PUT per
+    target is on the wire and the last value is always the one sent last.
+    Callers whose value got replaced share the outcome of the value that
+    replaced it. A value equal to the one in flight isn't sent again, e.g.
+    a drag that ends where it started.
+    """
+
+    def __init__(self) -> None:
+        self._pending: dict[Hashable, tuple[Any, Callable, list[asyncio.Future]]] = {}
+        self._in_flight: dict[Hashable, tuple[Any, list[asyncio.Future]]] = {}
+        self._drains: dict[Hashable, asyncio.Task] = {}
+
+    def async_submit(self, key: Hashable, value, send: Callable[[Any], Awaitable]) -> asyncio.Future:
+        """Queue value for key, the future resolves once it (or a newer one) is sent"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        waiters = [future]
+        if (replaced := self._pending.pop(key, None)) is not None:
+            waiters = replaced[2] + waiters
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None and in_flight[0] == value:
+            in_flight[1].extend(waiters)
+            return future
+        self._pending[key] = (value, send, waiters)
+        if key not in self._drains:
+            self._drains[key] = loop.create_task(self._async_drain(key))
+        return future
+
+    async def async_shutdown(self) -> None:
+        """Cancel what is still queued or in flight"""
+        for _, _, waiters in self._pending.values():
+            for waiter in waiters:
+                waiter.cancel()
+        self._pending.clear()
+        for _, waiters in self._in_flight.values():
+            for waiter in waiters:
+                waiter.cancel()
+        drains = list(self._drains.values())
+        for drain in drains:
+            drain.cancel()
+        await asyncio.gather(*drains, return_exceptions=True)
+        # A drain cancelled before it started never reached its finally
+        self._drains.clear()
+
+    async def _async_drain(self, key: Hashable) -> None:
+        try:
+            while (entry := self._pending.pop(key, None)) is not None:
+                value, send, waiters = entry
+                self._in_flight[key] = (value, waiters)
+                try:
+                    result = await send(value)
+                except asyncio.CancelledError:
+                    for waiter in waiters:
+                        waiter.cancel()
+                    raise
+                except Exception as err:  # pylint: disable=broad-except
+                    for waiter in waiters:
+                        if not waiter.done():
+                            waiter.set_exception(err)
+                else:
+                    for waiter in waiters:
+                        if not waiter.done():
+                            waiter.set_result(result)
+        finally:
+            del self._drains[key]
+            self._in_flight.pop(key, None)
+
+
 class OpenAudioDevice:
     """HA device for OpenAudio"""
 
-    def update(self, device_info) -> None:
-        """Update device information"""
-        self._device_id = device_info["device_id"]
+    __slots__ = (
+        "hub",
+        "raw",
+        "device_id",
+        "device_info",
+        "config",
+        "connection_info",
+        "device_metrics",
+        "device_attributes",
+        "uid_base",
+        "zones",
+        "inputs",
+    )
+
+    def __init__(self, hub: OpenAudioHub) -> None:
+        self.hub = hub
+        # Device record as last received
+        self.raw: dict | None = None
+        self.device_id: str | None = None
+        self.device_info: DeviceInfo | None = None
+        self.config = None
+        self.connection_info = None
+        self.device_metrics = None
+        self.device_attributes = None
+        self.uid_base = None
+        self.zones: dict[str, ZoneRecord] = {}
+        self.inputs: dict[str, InputRecord] = {}
+
+    @property
+    def is_current(self) -> bool:
+        """Return False once the hub no longer reports this device
+
+        A device that comes back gets a new OpenAudioDevice.
+        """
+        return self.hub.openaudios.get(self.device_id) is self
+
+    def update(self, device_info) -> bool:
+        """Update device information, return True if anything changed"""
+        if device_info == self.raw:
+            return False
+        self.raw = device_info
+        self.device_id = device_info["device_id"]
         self.config = device_info["config"]
         self.connection_info = device_info["connection"]
         self.device_metrics = device_info["metrics"]
         self.device_attributes = device_info["attributes"]
         self.uid_base = self.device_attributes["serial_number"]
-        self.zones = {}
-        self.inputs = {}
+        self.device_info = device_info_from_json(self.device_id, device_info)
+        return True
 
-    def __init__(self, hub: OpenAudioHub) -> None:
-        self.hub = hub
+    def update_metrics(self, device_metrics, connection_info) -> bool:
+        """Update metrics and connection information, return True if changed"""
+        if (
+            device_metrics == self.device_metrics
+            and connection_info == self.connection_info
+        ):
+            return False
+        self.device_metrics = device_metrics
+        self.connection_info = connection_info
+        # Keep raw current, so merges and the next /devices/info compare
+        # against what the sensors show
+        self.raw = {
+            **self.raw,
+            "metrics": device_metrics,
+            "connection": connection_info,
+        }
+        return True
 
-    @property
-    def device_info(self) -> DeviceInfo:
-        """Return device info"""
-        name = self.config["name"]
-        if name is None or name == "":
-            name = self._device_id
+    def merge(self, data: dict) -> bool:
+        """Merge changed fields into the device, return True if it changed
 
+        Sections such as connection or metrics are merged field by field.
+        """
+        merged = dict(self.raw)
+        for key, value in data.items():
+            if isinstance(value, dict) and isinstance(merged.get(key), dict):
+                value = {**merged[key], **value}
+            merged[key] = value
+        return self.update(merged)
+
+    def update_zones(self, zones: dict[str, dict]) -> set[str]:
+        """Reconcile the zones, return the ids of the zones that changed
+
+        Zones that are no longer reported are dropped, only zones whose JSON
+        changed are parsed again.
+        """
+        for zone_id in self.zones.keys() - zones.keys():
+            del self.zones[zone_id]
         return {
-            "identifiers": {(DOMAIN, f"{self.device_attributes['serial_number']}")},
-            "name": name,
-            "manufacturer": "OpenAudio",
-            "sw_version": self.device_attributes["firmware_version"],
-        }
\ No newline at end of file
+            zone_id for zone_id, raw in zones.items() if self.update_zone(zone_id, raw)
+        }
+
+    def update_zone(self, zone_id: str, raw: dict) -> bool:
+        """Update a zone, return True if it changed"""
+        record = self.zones.get(zone_id)
+        if record is not None and record.raw == raw:
+            return False
+        self.zones[zone_id] = ZoneRecord.from_json(zone_id, raw, self.hub.input_records)
+        return True
+
+    def update_input(self, input_id: str, raw: dict) -> bool:
+        """Update an input, return True if it changed"""
+        record = self.inputs.get(input_id)
+        if record is not None and record.raw == raw:
+            return False
+        self.inputs[input_id] = InputRecord.from_json(input_id, raw)
+        return True
+
+    def retain_inputs(self, input_ids) -> None:
+        """Drop the inputs that are no longer reported"""
+        for input_id in self.inputs.keys() - set(input_ids):
+            del self.inputs[input_id]
+
+    def refresh_zone_titles(self, input_ids) -> set[str]:
+        """Parse the zones playing one of input_ids again"""
+        changed = set()
+        for zone_id, record in self.zones.items():
+            if record.active_input in input_ids:
+                self.zones[zone_id] = ZoneRecord.from_json(zone_id, record.raw, self.hub.input_records)
+                changed.add(zone_id)
+        return changed
+
+    def merge_zone(self, zone_id: str, data: dict) -> bool:
+        """Merge changed fields into a zone, return True if it changed"""
+        return self.update_zone(zone_id, {**self.zones[zone_id].raw, **data})
+
+    def merge_input(self, input_id: str, data: dict) -> bool:
+        """Merge changed fields into an input, return True if it changed"""
+        return self.update_input(input_id, {**self.inputs[input_id].raw, **data})
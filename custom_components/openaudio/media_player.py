@@ -6,14 +6,27 @@ from homeassistant.components.media_player import (
     MediaType,
 )
 
+from abc import ABC, abstractmethod
+from collections.abc import Awaitable, Callable
+from functools import partial
+
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant, callback
-from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
-from .const import DOMAIN, LOGGER
-from .hub import OpenAudioHub, OpenAudioDevice
+from .const import (
+    DOMAIN,
+    LOGGER,
+    SECTION_INPUTS,
+    SECTION_ZONES,
+    TIER_DEVICES,
+    TIER_ZONES,
+)
+from .entity import OpenAudioEntity, async_track_entities
+from .hub import OpenAudioChanges, OpenAudioHub, OpenAudioDevice
+
+_MISSING = object()
+
 
 async def async_setup_entry(
     hass: HomeAssistant,
@@ -23,54 +36,107 @@ async def async_setup_entry(
     """Setup the config entry for my device."""
 
     hub: OpenAudioHub = hass.data[DOMAIN][config_entry.entry_id]["hub"]
-    coordinator = hass.data[DOMAIN][config_entry.entry_id]["coordinator"]
-
-    entities = []    
-    for amp_id in hub.openaudios:
-        amp = hub.openaudios[amp_id]
-
-        # Add zone entities
-        for zone_id in amp.zones:
-            entities.append(
-                Zone(amp, coordinator, config_entry, zone_id)
-            )
-
-        # Add input entities    
-        for input_id in amp.inputs:
-            input = amp.inputs[input_id]
-            entities.append(
-                InputMediaPlayer(amp, coordinator, config_entry, input_id)
-            )
-    if entities:
-        async_add_entities(entities)
-
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]["coordinators"][TIER_ZONES]
 
-class OpenAudioMediaPlayerBase(CoordinatorEntity, MediaPlayerEntity):
+    @callback
+    def _describe_entities() -> dict[str, Callable[[], MediaPlayerEntity]]:
+        entities = {}
+        for device_id, (zone_ids, input_ids) in hub.topology.devices.items():
+            amp = hub.openaudios[device_id]
+            # Add zone entities
+            for zone_id in zone_ids:
+                entities[f"zone_{zone_id}"] = partial(
+                    Zone, amp, coordinator, config_entry, zone_id
+                )
+
+            # Add input entities
+            for input_id in input_ids:
+                entities[f"input_{input_id}"] = partial(
+                    InputMediaPlayer, amp, coordinator, config_entry, input_id
+                )
+        return entities
+
+    # Zones and inputs come and go with the zones tier, all of a device's
+    # with the devices tier
+    coordinators = hass.data[DOMAIN][config_entry.entry_id]["coordinators"]
+    async_track_entities(
+        hass,
+        config_entry,
+        (coordinator, coordinators[TIER_DEVICES]),
+        async_add_entities,
+        _describe_entities,
+    )
+
+
+class OpenAudioMediaPlayerBase(OpenAudioEntity, MediaPlayerEntity, ABC):
     """Base class for our zone media players"""
 
-    _attr_has_entity_name = True
-
     def __init__(self, amp: OpenAudioDevice, coordinator, config_entry) -> None:
         """Initialize the sensor."""
-        super().__init__(
-            coordinator,
-        )
-        self._amp = amp
-        self._config_entry = config_entry
+        super().__init__(amp, coordinator, config_entry)
+        self._rollback = {}
+        self._commands_in_flight = 0
 
     @property
-    def device_info(self) -> DeviceInfo:
-        return self._amp.device_info
+    @abstractmethod
+    def _exists(self) -> bool:
+        """Return False once the record is no longer reported"""
 
-    @callback
-    def _handle_coordinator_update(self) -> None:
-        self.async_write_ha_state()
+    @property
+    @abstractmethod
+    def _raw(self) -> dict:
+        """JSON of the record the entity shows"""
+
+    @abstractmethod
+    def _store(self, raw: dict) -> None:
+        """Replace the record the entity shows"""
+
+    async def _async_optimistic(
+        self, updates: dict, command: Callable[[], Awaitable]
+    ) -> None:
+        """Show updates right away, then send the command
+
+        Updates that match what the record already shows skip the network.
+        Otherwise the record is patched and the state written before the
+        command goes out. If the command fails the record is rolled back to
+        what it showed before the first command still in flight, otherwise
+        the next poll confirms or corrects it. A record that is no longer
+        reported by then is left to the platform to remove.
+        """
+        raw = self._raw
+        if all(raw.get(key, _MISSING) == value for key, value in updates.items()):
+            return
+
+        for key in updates:
+            self._rollback.setdefault(key, raw.get(key, _MISSING))
+        self._commands_in_flight += 1
+        self._store({**raw, **updates})
+        self._async_write_state()
+        try:
+            await command()
+        except Exception:
+            if not self._exists:
+                raise
+            raw = dict(self._raw)
+            for key, value in self._rollback.items():
+                if value is _MISSING:
+                    raw.pop(key, None)
+                else:
+                    raw[key] = value
+            self._store(raw)
+            self._async_write_state()
+            raise
+        finally:
+            self._commands_in_flight -= 1
+            if not self._commands_in_flight:
+                self._rollback.clear()
 
 
 class Zone(OpenAudioMediaPlayerBase):
     """Zone media player"""
 
     device_class = MediaPlayerDeviceClass.SPEAKER
+    _sections = (SECTION_ZONES,)
 
     def __init__(self, amp: OpenAudioDevice, coordinator, config_entry, zone_id) -> None:
         """Initialize the sensor."""
@@ -81,66 +147,42 @@ class Zone(OpenAudioMediaPlayerBase):
     def unique_id(self) -> str:
         return f"zone_{self._zone_id}"
 
+    def _is_changed(self, changes: OpenAudioChanges) -> bool:
+        return changes.sources or self._zone_id in changes.zones
+
+    @property
+    def _exists(self) -> bool:
+        return self._amp.is_current and self._zone_id in self._amp.zones
+
+    @property
+    def _raw(self) -> dict:
+        return self._amp.zones[self._zone_id].raw
+
+    def _store(self, raw: dict) -> None:
+        self._amp.update_zone(self._zone_id, raw)
+
     @property
     def name(self) -> str:
-        return f'{self._amp.zones[self._zone_id]["name"]} Zone'
+        return self._amp.zones[self._zone_id].display_name
 
     @property
     def extra_state_attributes(self):
         """Return additional attributes for the zone."""
-        attributes = {}
-        
-        zone_data = self._amp.zones[self._zone_id]
-        
-        # Add warning messages as attributes if present
-        if "warnings" in zone_data and zone_data["warnings"]:
-            attributes["warnings"] = zone_data["warnings"]
-            attributes["warning_count"] = len(zone_data["warnings"])
-            
+        attributes = self._amp.zones[self._zone_id].attributes
+        if (stale := self._stale_attributes) is not None:
+            return {**attributes, **stale}
         return attributes
-    
+
     @property
     def state(self) -> MediaPlayerState | None:
         """State of the player."""
-        # Check if there's an active input for this zone
-        zone_data = self._amp.zones[self._zone_id]
-        
-        # If zone has an active_input that's not None, it's playing
-        if "active_input" in zone_data and zone_data["active_input"] is not None:
-            return MediaPlayerState.PLAYING
-        
-        # No active input but zone is on
-        if zone_data.get("enabled", True):
-            return MediaPlayerState.ON
-            
-        # Zone is disabled
-        return MediaPlayerState.OFF
-        
+        return self._amp.zones[self._zone_id].state
+
     @property
     def media_title(self) -> str | None:
         """Title of current playing media."""
-        zone_data = self._amp.zones[self._zone_id]
-        
-        # Only provide title if we're playing
-        if "active_input" in zone_data and zone_data["active_input"] is not None:
-            active_input_id = zone_data["active_input"]
-            
-            # Get the name of the active input
-            if active_input_id in self._amp.inputs:
-                input_data = self._amp.inputs[active_input_id]
-                
-                # Only use input name if input class is 0
-                if input_data.get("input_class") == 0:
-                    input_name = input_data.get("name")
-                    if input_name:
-                        return f"Playing from {input_name}"
-                
-                # If we can't use the name, fall back to type
-                input_type = input_data.get("input_type", "Unknown")
-                return f"Playing from {input_type}"
-                
-        return None
-    
+        return self._amp.zones[self._zone_id].media_title
+
     @property
     def media_artist(self) -> str | None:
         """Artist of current playing media."""
@@ -148,21 +190,10 @@ class Zone(OpenAudioMediaPlayerBase):
         # you could return it here
         return None
     
-    @property 
+    @property
     def icon(self) -> str | None:
-        zone_data = self._amp.zones[self._zone_id]
-        
-        # Show warning icon if there are warnings
-        if "warnings" in zone_data and zone_data["warnings"]:
-            return "mdi:speaker-message"
-        
-        """Return dynamic icon based on playing state."""
-        if self.state == MediaPlayerState.PLAYING:
-            return "mdi:speaker-play"
-        elif self.state == MediaPlayerState.ON:
-            return "mdi:speaker"
-        else:
-            return "mdi:speaker-off"
+        """Return dynamic icon based on warnings and playing state."""
+        return self._amp.zones[self._zone_id].icon
 
     @property
     def supported_features(self) -> MediaPlayerEntityFeature:
@@ -175,29 +206,19 @@ class Zone(OpenAudioMediaPlayerBase):
     @property
     def volume_level(self) -> float | None:
         """Volume level of the media player (0..1)."""
-        return float(self._amp.zones[self._zone_id]["volume"]) / 100.0
+        return self._amp.zones[self._zone_id].volume_level
 
     @property
-    def source_list(self) -> list[str]:
+    def source_list(self) -> tuple[str, ...]:
         """List of available input sources."""
-        sources = ["None"]
-
-        for i in self._amp.hub.group_inputs:
-                input = self._amp.hub.group_inputs[i]
-                sources.append(input)
-
-        return sources
+        return self._amp.hub.sources.names
 
     @property
     def source(self) -> str:
         """Currently selected input source"""
-        zone_inputs = self._amp.zones[self._zone_id]["input"]
-        #LOGGER.debug("----> zone_inputs %s", zone_inputs)
-        for input_id in zone_inputs:
-            if self._amp.hub.group_inputs[str(input_id)] is not None:
-                return self._amp.hub.group_inputs[str(input_id)]
-
-        return "None"
+        return self._amp.hub.sources.source_of(
+            self._amp.zones[self._zone_id].input_ids
+        )
 
     @property
     def media_content_type(self):
@@ -207,30 +228,29 @@ class Zone(OpenAudioMediaPlayerBase):
     async def async_set_volume_level(self, volume):
         """Set volume level, range 0..1."""
         LOGGER.debug("Setting volume to %s for zone %s", volume, self._zone_id)
-        await self._amp.hub.set_zone_volume(self._zone_id, int(volume*100))
-        await self.async_update()
+        volume = int(volume*100)
+        await self._async_optimistic(
+            {"volume": volume},
+            partial(self._amp.hub.set_zone_volume, self._zone_id, volume),
+        )
 
     async def async_select_source(self, source: str):
         """Select input source."""
 
-        input_id = None
-        #LOGGER.debug("----> source: %s", source)
-        for i in self._amp.hub.group_inputs:
-            input = self._amp.hub.group_inputs[i]
-            if input == source:
-                input_id = i
-                break
-
+        input_id = self._amp.hub.sources.ids_by_name.get(source)
 
         LOGGER.debug("Setting input to %s for zone %s", input_id, self._zone_id)
-        await self._amp.hub.set_zone_input(self._zone_id, input_id)
-        await self.async_update()
+        await self._async_optimistic(
+            {"input": [input_id] if input_id is not None else []},
+            partial(self._amp.hub.set_zone_input, self._zone_id, input_id),
+        )
 
 
 class InputMediaPlayer(OpenAudioMediaPlayerBase):
     """Input media player"""
     
     device_class = MediaPlayerDeviceClass.RECEIVER
+    _sections = (SECTION_INPUTS,)
     
     def __init__(self, amp: OpenAudioDevice, coordinator, config_entry, input_id) -> None:
         """Initialize the input media player."""
@@ -240,10 +260,24 @@ class InputMediaPlayer(OpenAudioMediaPlayerBase):
     @property
     def unique_id(self) -> str:
         return f"input_{self._input_id}"
+
+    def _is_changed(self, changes: OpenAudioChanges) -> bool:
+        return self._input_id in changes.inputs
+
+    @property
+    def _exists(self) -> bool:
+        return self._amp.is_current and self._input_id in self._amp.inputs
+
+    @property
+    def _raw(self) -> dict:
+        return self._amp.inputs[self._input_id].raw
+
+    def _store(self, raw: dict) -> None:
+        self._amp.update_input(self._input_id, raw)
     
     @property
     def name(self) -> str:
-        return f"Source {self._amp.inputs[self._input_id]["name"]} Input"
+        return self._amp.inputs[self._input_id].display_name
     
     @property
     def supported_features(self) -> MediaPlayerEntityFeature:
@@ -260,81 +294,57 @@ class InputMediaPlayer(OpenAudioMediaPlayerBase):
     @property
     def state(self) -> MediaPlayerState | None:
         """State of the player."""
-        input_data = self._amp.inputs[self._input_id]
-        # Check if input is enabled, defaulting to True if not present
-        if input_data.get("enabled", True):
-            return MediaPlayerState.ON
-        else:
-            return MediaPlayerState.OFF
+        return self._amp.inputs[self._input_id].state
     
     @property
     def volume_level(self) -> float | None:
         """Volume level of the media player (0..1)."""
-        input_data = self._amp.inputs[self._input_id]
-        if "volume" in input_data and input_data["volume"] is not None:
-            return float(input_data["volume"]) / 100.0
-        return None
+        return self._amp.inputs[self._input_id].volume_level
     
     @property
     def source(self) -> str:
         """Currently selected input type."""
-        return self._amp.inputs[self._input_id]["input_type"][0]
+        return self._amp.inputs[self._input_id].input_type
     
     @property
     def source_list(self) -> list[str]:
         """List of available input types."""
-        available_types = self._amp.inputs[self._input_id]["available_types"]
-        
-        # Get current source by using the source property
-        current_source = self.source
-        
-        # Add current source if not already in the list
-        if current_source and current_source not in available_types:
-            return available_types + [current_source]
-        
-        return available_types
+        return list(self._amp.inputs[self._input_id].source_list)
     
     @property
     def icon(self):
         """Return dynamic icon based on input type."""
-        #LOGGER.debug("OpenAudio source : %s", self.source)
-        input_type = self.source
-        #LOGGER.debug("OpenAudio input type: %s", input_type)
-        # Map input types to appropriate icons
-        icon_map = {
-            "Airplay": "mdi:cast-audio-variant",
-            "DLNA": "mdi:cast-audio",
-            "Spotify": "mdi:spotify",
-            "USB": "mdi:usb",
-            "Bluetooth": "mdi:bluetooth-audio",
-            "RCA": "mdi:audio-input-rca",
-            "Optical": "mdi:laser-pointer",
-            "Google Cast": "mdi:cast-audio"
-        }
-        
-        # Return the mapped icon or a default
-        return icon_map.get(input_type, "mdi:music-box")
+        return self._amp.inputs[self._input_id].icon
     
     async def async_set_volume_level(self, volume):
         """Set volume level, range 0..1."""
         LOGGER.debug("Setting volume to %s for input %s", volume, self._input_id)
-        await self._amp.hub.set_input_volume(self._input_id, int(volume*100))
-        await self.async_update()
+        volume = int(volume*100)
+        await self._async_optimistic(
+            {"volume": volume},
+            partial(self._amp.hub.set_input_volume, self._input_id, volume),
+        )
     
     async def async_select_source(self, source: str):
         """Select input type."""
         LOGGER.debug("Setting input type to %s for input %s", source, self._input_id)
-        await self._amp.hub.set_input_type(self._input_id, source)
-        await self.async_update()
+        await self._async_optimistic(
+            {"input_type": [source]},
+            partial(self._amp.hub.set_input_type, self._input_id, source),
+        )
     
     async def async_turn_on(self) -> None:
         """Turn the input on (enable it)."""
         LOGGER.debug("Enabling input %s", self._input_id)
-        await self._amp.hub.set_input_enabled(self._input_id, True)
-        await self.async_update()
+        await self._async_optimistic(
+            {"enabled": True},
+            partial(self._amp.hub.set_input_enabled, self._input_id, True),
+        )
     
     async def async_turn_off(self) -> None:
         """Turn the input off (disable it)."""
         LOGGER.debug("Disabling input %s", self._input_id)
-        await self._amp.hub.set_input_enabled(self._input_id, False)
-        await self.async_update()
+        await self._async_optimistic(
+            {"enabled": False},
+            partial(self._amp.hub.set_input_enabled, self._input_id, False),
+        )
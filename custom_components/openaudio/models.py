@@ -0,0 +1,194 @@
+"""Records for OpenAudio devices, zones and inputs
+
+The JSON of the API is parsed once per poll into these records, with what
+the entities show precomputed, so entity properties are plain attribute
+reads.
+"""
+from __future__ import annotations
+
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass, field
+from typing import Any
+
+from homeassistant.components.media_player import MediaPlayerState
+from homeassistant.helpers.entity import DeviceInfo
+
+from .const import DOMAIN
+
+# Icons of the input types
+INPUT_ICONS = {
+    "Airplay": "mdi:cast-audio-variant",
+    "DLNA": "mdi:cast-audio",
+    "Spotify": "mdi:spotify",
+    "USB": "mdi:usb",
+    "Bluetooth": "mdi:bluetooth-audio",
+    "RCA": "mdi:audio-input-rca",
+    "Optical": "mdi:laser-pointer",
+    "Google Cast": "mdi:cast-audio",
+}
+DEFAULT_INPUT_ICON = "mdi:music-box"
+
+# Source of a zone that plays nothing
+NO_SOURCE = "None"
+
+
+@dataclass(frozen=True, slots=True)
+class InputRecord:
+    """An input as last reported, with what its entity shows"""
+
+    input_id: str
+    raw: dict[str, Any] = field(repr=False)
+    name: str | None
+    input_class: int | None
+    input_type: str | None
+    display_name: str
+    state: MediaPlayerState
+    volume_level: float | None
+    source_list: tuple[str, ...]
+    icon: str
+
+    @classmethod
+    def from_json(cls, input_id: str, raw: dict[str, Any]) -> InputRecord:
+        """Parse the merged config and state of an input"""
+        input_type = raw.get("input_type")
+        if isinstance(input_type, list):
+            input_type = input_type[0] if input_type else None
+
+        source_list = tuple(raw.get("available_types") or ())
+        if input_type and input_type not in source_list:
+            source_list += (input_type,)
+
+        volume = raw.get("volume")
+
+        return cls(
+            input_id=input_id,
+            raw=raw,
+            name=raw.get("name"),
+            input_class=raw.get("input_class"),
+            input_type=input_type,
+            display_name=f"Source {raw.get('name')} Input",
+            state=(
+                MediaPlayerState.ON if raw.get("enabled", True) else MediaPlayerState.OFF
+            ),
+            volume_level=float(volume) / 100.0 if volume is not None else None,
+            source_list=source_list,
+            icon=INPUT_ICONS.get(input_type, DEFAULT_INPUT_ICON),
+        )
+
+    @property
+    def playing_title(self) -> str:
+        """Title of a zone playing from this input"""
+        # Only use input name if input class is 0
+        if self.input_class == 0 and self.name:
+            return f"Playing from {self.name}"
+        return f"Playing from {self.input_type or 'Unknown'}"
+
+
+@dataclass(frozen=True, slots=True)
+class ZoneRecord:
+    """A zone as last reported, with what its entity shows"""
+
+    zone_id: str
+    raw: dict[str, Any] = field(repr=False)
+    input_ids: tuple[str, ...]
+    active_input: str | None
+    display_name: str
+    state: MediaPlayerState
+    media_title: str | None
+    icon: str
+    volume_level: float
+    attributes: Mapping[str, Any]
+
+    @classmethod
+    def from_json(
+        cls, zone_id: str, raw: dict[str, Any], inputs: Mapping[str, InputRecord]
+    ) -> ZoneRecord:
+        """Parse a zone, inputs resolve the title of what it plays"""
+        active_input = raw.get("active_input")
+        warnings = raw.get("warnings")
+
+        # If zone has an active_input that's not None, it's playing
+        if active_input is not None:
+            state = MediaPlayerState.PLAYING
+        # No active input but zone is on
+        elif raw.get("enabled", True):
+            state = MediaPlayerState.ON
+        # Zone is disabled
+        else:
+            state = MediaPlayerState.OFF
+
+        media_title = None
+        if active_input is not None and active_input in inputs:
+            media_title = inputs[active_input].playing_title
+
+        if warnings:
+            icon = "mdi:speaker-message"
+        elif state == MediaPlayerState.PLAYING:
+            icon = "mdi:speaker-play"
+        elif state == MediaPlayerState.ON:
+            icon = "mdi:speaker"
+        else:
+            icon = "mdi:speaker-off"
+
+        attributes = {}
+        # Add warning messages as attributes if present
+        if warnings:
+            attributes = {"warnings": warnings, "warning_count": len(warnings)}
+
+        return cls(
+            zone_id=zone_id,
+            raw=raw,
+            input_ids=tuple(str(input_id) for input_id in raw.get("input") or ()),
+            active_input=active_input,
+            display_name=f'{raw["name"]} Zone',
+            state=state,
+            media_title=media_title,
+            icon=icon,
+            volume_level=float(raw["volume"]) / 100.0,
+            attributes=attributes,
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class SourceCatalog:
+    """Sources every zone can select, shared by all zone entities
+
+    A new catalog is published when the inputs change, entities never
+    mutate it.
+    """
+
+    names: tuple[str, ...] = (NO_SOURCE,)
+    ids_by_name: Mapping[str, str] = field(default_factory=dict)
+    names_by_id: Mapping[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def from_input_ids(cls, input_ids: Iterable[str]) -> SourceCatalog:
+        """Build the catalog of the inputs of a system"""
+        names_by_id = {input_id: f"Source {input_id}" for input_id in input_ids}
+        return cls(
+            names=(NO_SOURCE, *names_by_id.values()),
+            ids_by_name={name: input_id for input_id, name in names_by_id.items()},
+            names_by_id=names_by_id,
+        )
+
+    def source_of(self, input_ids: Iterable[str]) -> str:
+        """Name of the first known input of a zone"""
+        for input_id in input_ids:
+            if (name := self.names_by_id.get(input_id)) is not None:
+                return name
+        return NO_SOURCE
+
+
+def device_info_from_json(device_id: str, raw: dict[str, Any]) -> DeviceInfo:
+    """Build the device info of a /devices/info entry"""
+    attributes = raw["attributes"]
+    name = raw["config"]["name"]
+    if name is None or name == "":
+        name = device_id
+
+    return {
+        "identifiers": {(DOMAIN, f"{attributes['serial_number']}")},
+        "name": name,
+        "manufacturer": "OpenAudio",
+        "sw_version": attributes["firmware_version"],
+    }
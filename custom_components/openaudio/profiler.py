@@ -0,0 +1,129 @@
+"""On-demand profiling of the OpenAudio poll and command paths"""
+from __future__ import annotations
+
+import cProfile
+import io
+import pstats
+import tracemalloc
+
+from datetime import datetime
+
+from homeassistant.components import persistent_notification
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+
+from .const import DOMAIN, LOGGER
+
+
+class OpenAudioProfiler:
+    """Profile the event loop for the next polls and commands
+
+    Profiling starts right away and stops once count coordinator refreshes
+    and commands went through the hubs it is attached to. Everything that
+    runs in between is captured, the entity updates that follow a refresh
+    included. The results are written to the config directory and the
+    top entries shown in a persistent notification.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        count: int,
+        use_cprofile: bool = True,
+        use_tracemalloc: bool = False,
+        top: int = 15,
+    ) -> None:
+        self._hass = hass
+        self._remaining = count
+        self._top = top
+        self._profile = cProfile.Profile() if use_cprofile else None
+        self._use_tracemalloc = use_tracemalloc
+        self._memory_start: tracemalloc.Snapshot | None = None
+        self._on_stop: list = []
+        self.active = False
+
+    @callback
+    def async_start(self) -> None:
+        """Start profiling
+
+        Raises HomeAssistantError when another profiler or tracemalloc
+        user is running, e.g. the profiler integration: their results
+        would mix with ours and stopping would end theirs.
+        """
+        if self._use_tracemalloc:
+            if tracemalloc.is_tracing():
+                raise HomeAssistantError("tracemalloc is already tracing")
+            tracemalloc.start()
+            self._memory_start = tracemalloc.take_snapshot()
+        if self._profile is not None:
+            try:
+                self._profile.enable()
+            except ValueError as err:
+                if self._memory_start is not None:
+                    self._memory_start = None
+                    tracemalloc.stop()
+                raise HomeAssistantError(
+                    f"Another profiler is already running: {err}"
+                ) from err
+        self.active = True
+
+    @callback
+    def async_on_stop(self, listener) -> None:
+        """Call listener once profiling stopped"""
+        self._on_stop.append(listener)
+
+    @callback
+    def async_note_event(self) -> None:
+        """Count a refresh or a command, stop after the last one"""
+        if not self.active:
+            return
+        self._remaining -= 1
+        if self._remaining <= 0:
+            self.async_stop()
+
+    @callback
+    def async_stop(self) -> None:
+        """Stop profiling and report in the background"""
+        if not self.active:
+            return
+        self.active = False
+        if self._profile is not None:
+            self._profile.disable()
+        memory_end = None
+        if self._memory_start is not None:
+            memory_end = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+        for listener in self._on_stop:
+            listener()
+        self._hass.async_create_task(self._async_report(memory_end))
+
+    async def _async_report(self, memory_end: tracemalloc.Snapshot | None) -> None:
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        base_path = self._hass.config.path(f"{DOMAIN}_profile_{stamp}")
+        summary = await self._hass.async_add_executor_job(
+            self._write_results, base_path, memory_end
+        )
+        LOGGER.info("OpenAudio profile written to %s.*", base_path)
+        persistent_notification.async_create(
+            self._hass,
+            f"Results written to `{base_path}.*`\n\n```\n{summary}\n```",
+            title="OpenAudio profile",
+            notification_id=f"{DOMAIN}_profile",
+        )
+
+    def _write_results(self, base_path: str, memory_end: tracemalloc.Snapshot | None) -> str:
+        summary = []
+        if self._profile is not None:
+            self._profile.dump_stats(f"{base_path}.prof")
+            output = io.StringIO()
+            stats = pstats.Stats(self._profile, stream=output)
+            stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self._top)
+            summary.append(output.getvalue().strip())
+        if memory_end is not None and self._memory_start is not None:
+            differences = memory_end.compare_to(self._memory_start, "lineno")
+            with open(f"{base_path}.tracemalloc.txt", "w", encoding="utf-8") as file:
+                file.writelines(f"{difference}\n" for difference in differences)
+            summary.append(
+                "\n".join(str(difference) for difference in differences[: self._top])
+            )
+        return "\n\n".join(summary)
@@ -0,0 +1,130 @@
+"""Push updates for OpenAudio"""
+from __future__ import annotations
+
+import asyncio
+import random
+
+from typing import TYPE_CHECKING
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+
+from .const import (
+    LOGGER,
+    PUSH_RECONNECT_MAX_DELAY,
+    PUSH_RECONNECT_MIN_DELAY,
+)
+from .pyopenaudio import UnexpectedException
+from .hub import OpenAudioChanges, OpenAudioHub
+
+if TYPE_CHECKING:
+    from . import OpenAudioUpdateCoordinator
+
+
+class OpenAudioPushListener:
+    """Subscribe to the events of an OpenAudio host
+
+    While the event channel is up, events are applied to the hub records as
+    they arrive and polling drops to a slow safety net. When the channel is
+    down it reconnects with jittered exponential backoff and the coordinator
+    polls at the configured interval.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        hub: OpenAudioHub,
+        coordinator: OpenAudioUpdateCoordinator,
+        devices_coordinator: OpenAudioUpdateCoordinator,
+    ) -> None:
+        """Listen for the zones coordinator
+
+        Pushed device changes are handed to devices_coordinator, whose
+        listeners show device data.
+        """
+        self._hass = hass
+        self._hub = hub
+        self._coordinator = coordinator
+        self._devices_coordinator = devices_coordinator
+        self._task: asyncio.Task | None = None
+        self._refresh_task: asyncio.Task | None = None
+        self.connected = False
+
+    @callback
+    def async_start(self, entry: ConfigEntry) -> None:
+        """Start listening in the background"""
+        self._task = entry.async_create_background_task(
+            self._hass, self._async_run(), "openaudio push listener"
+        )
+
+    async def async_stop(self) -> None:
+        """Stop listening"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+        self._set_connected(False)
+
+    async def _async_run(self) -> None:
+        delay = PUSH_RECONNECT_MIN_DELAY
+        while True:
+            try:
+                await self._hub.listen_events(self._on_event, self._on_connect)
+            except (UnexpectedException, asyncio.TimeoutError, ValueError) as err:
+                LOGGER.debug("OpenAudio event channel unavailable: %s", err)
+
+            if self.connected:
+                # The channel was up, start over with a short delay
+                delay = PUSH_RECONNECT_MIN_DELAY
+                self._set_connected(False)
+                await self._coordinator.async_request_refresh()
+
+            await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+            delay = min(delay * 2, PUSH_RECONNECT_MAX_DELAY)
+
+    @callback
+    def _on_connect(self) -> None:
+        LOGGER.debug("OpenAudio event channel connected")
+        self._set_connected(True)
+        # Catch up with whatever changed while the channel was down
+        self._request_refresh()
+
+    @callback
+    def _on_event(self, event) -> None:
+        if not isinstance(event, dict):
+            # Valid JSON but not an event, e.g. a keepalive string
+            LOGGER.debug("Ignoring OpenAudio event frame %r", event)
+            return
+        changes = self._hub.apply_event(event)
+        if changes is None:
+            self._request_refresh()
+            return
+        if changes.devices:
+            self._devices_coordinator.async_set_updated_data(
+                OpenAudioChanges(devices=changes.devices)
+            )
+        if changes.zones or changes.inputs:
+            self._coordinator.async_set_updated_data(
+                changes._replace(devices=frozenset())
+            )
+
+    @callback
+    def _request_refresh(self) -> None:
+        """Request a refresh, a burst of events shares one pending request"""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = self._hass.async_create_task(
+                self._coordinator.async_request_refresh()
+            )
+
+    @callback
+    def _set_connected(self, connected: bool) -> None:
+        if connected == self.connected:
+            return
+        self.connected = connected
+        self._coordinator.async_set_push_connected(connected)
@@ -0,0 +1,33 @@
+"""Async client of the OpenAudio REST API
+
+Has no dependency on Home Assistant, only on aiohttp. The command line
+tool is run from the directory holding this package:
+
+    python -m pyopenaudio --help
+"""
+from .client import (
+    ENDPOINTS,
+    CircuitBreaker,
+    Endpoint,
+    EndpointStats,
+    LatencyHistogram,
+    OpenAudioClient,
+    RequestStats,
+    api_version,
+    request_deadline,
+)
+from .exceptions import CircuitOpenException, UnexpectedException
+
+__all__ = [
+    "ENDPOINTS",
+    "CircuitBreaker",
+    "CircuitOpenException",
+    "Endpoint",
+    "EndpointStats",
+    "LatencyHistogram",
+    "OpenAudioClient",
+    "RequestStats",
+    "UnexpectedException",
+    "api_version",
+    "request_deadline",
+]
@@ -0,0 +1,6 @@
+"""Run the OpenAudio command line tool"""
+import sys
+
+from .cli import main
+
+sys.exit(main())
@@ -0,0 +1,199 @@
+"""Command line tool for the OpenAudio REST API
+
+Bulk reads, bulk zone commands and a load test, e.g. to size how often
+an amp can be polled before its response times degrade.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import sys
+import time
+
+from collections import Counter
+from collections.abc import Sequence
+
+from .client import OpenAudioClient
+from .exceptions import UnexpectedException
+
+# What info and bench read, by name
+READS = {
+    "server": lambda client, host: client.get_server_device_id(host),
+    "devices": lambda client, host: client.get_devices_info(host),
+    "zones": lambda client, host: client.get_zones_info(host),
+    "inputs": lambda client, host: client.get_inputs_info(host),
+}
+PERCENTILES = (50, 90, 95, 99)
+
+
+def percentile(ordered: Sequence[float], percent: float) -> float:
+    """Nearest-rank percentile of an ordered, non-empty sequence"""
+    rank = math.ceil(percent / 100 * len(ordered))
+    return ordered[min(max(rank, 1), len(ordered)) - 1]
+
+
+async def _info(client: OpenAudioClient, args) -> dict:
+    names = args.section or list(READS)
+    if unknown := set(names) - READS.keys():
+        raise UnexpectedException(f"Unknown section {', '.join(sorted(unknown))}")
+    results = await asyncio.gather(
+        *(READS[name](client, args.host) for name in names)
+    )
+    return dict(zip(names, results))
+
+
+async def _zone_ids(client: OpenAudioClient, args) -> list[str]:
+    if args.zones:
+        return args.zones
+    return (await client.get_zones(args.host))["zone_ids"]
+
+
+async def _for_zones(client: OpenAudioClient, args, send) -> dict:
+    """Send a command to every zone, at most args.concurrency at a time"""
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def run(zone_id: str) -> str:
+        async with semaphore:
+            try:
+                await send(zone_id)
+            except (UnexpectedException, asyncio.TimeoutError) as err:
+                return f"error: {err or type(err).__name__}"
+            return "ok"
+
+    zone_ids = await _zone_ids(client, args)
+    results = await asyncio.gather(*(run(zone_id) for zone_id in zone_ids))
+    return dict(zip(zone_ids, results))
+
+
+async def _volume(client: OpenAudioClient, args) -> dict:
+    return await _for_zones(
+        client,
+        args,
+        lambda zone_id: client.set_zone_volume(args.host, zone_id, args.volume),
+    )
+
+
+async def _input(client: OpenAudioClient, args) -> dict:
+    input_id = "" if args.input_id.lower() == "none" else args.input_id
+    return await _for_zones(
+        client,
+        args,
+        lambda zone_id: client.set_zone_input(args.host, zone_id, input_id),
+    )
+
+
+async def _bench(client: OpenAudioClient, args) -> dict:
+    """Read an endpoint args.requests times with args.concurrency workers
+
+    The client of a load test neither retries nor fails fast, see _main,
+    each call is a single HTTP request whose latency and errors are the
+    device's.
+    """
+    fetch = READS[args.endpoint]
+    calls = iter(range(args.requests))
+    latencies: list[float] = []
+    errors: Counter[str] = Counter()
+
+    async def worker() -> None:
+        for _ in calls:
+            start = time.perf_counter()
+            try:
+                await fetch(client, args.host)
+            except (UnexpectedException, asyncio.TimeoutError) as err:
+                errors[str(err) or type(err).__name__] += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    result = {
+        "endpoint": args.endpoint,
+        "concurrency": args.concurrency,
+        "calls": args.requests,
+        "ok": len(latencies),
+        "errors": dict(errors),
+        "http_requests": client.stats.requests,
+        "bytes_received": client.stats.bytes_received,
+        "seconds": round(elapsed, 3),
+        "calls_per_second": round(args.requests / elapsed, 1) if elapsed else None,
+    }
+    if latencies:
+        result["latency_ms"] = {
+            **{
+                f"p{percent}": round(percentile(latencies, percent) * 1000, 2)
+                for percent in PERCENTILES
+            },
+            "max": round(latencies[-1] * 1000, 2),
+        }
+    return result
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="pyopenaudio",
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("host", help="address of the amp serving the API")
+    parser.add_argument(
+        "--concurrency", type=int, default=4, help="requests in flight at a time"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    info = commands.add_parser("info", help="read the bulk endpoints")
+    info.add_argument(
+        "section", nargs="*", help=f"any of {', '.join(READS)}, all if none"
+    )
+    info.set_defaults(run=_info)
+
+    volume = commands.add_parser("volume", help="set the volume of zones")
+    volume.add_argument("volume", type=int)
+    volume.add_argument("zones", nargs="*", help="zone ids, all zones if none")
+    volume.set_defaults(run=_volume)
+
+    zone_input = commands.add_parser("input", help="set the input of zones")
+    zone_input.add_argument("input_id", help="input id, none to clear")
+    zone_input.add_argument("zones", nargs="*", help="zone ids, all zones if none")
+    zone_input.set_defaults(run=_input)
+
+    bench = commands.add_parser("bench", help="load test a read endpoint")
+    bench.add_argument("--endpoint", choices=list(READS), default="zones")
+    bench.add_argument("--requests", type=int, default=500)
+    bench.set_defaults(run=_bench)
+    return parser
+
+
+async def _main(args) -> dict:
+    if args.run is _bench:
+        client = OpenAudioClient(
+            connections_per_host=args.concurrency,
+            retry_attempts=1,
+            circuit_breaker=False,
+        )
+    else:
+        client = OpenAudioClient(connections_per_host=args.concurrency)
+    try:
+        return await args.run(client, args)
+    finally:
+        await client.close()
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Run the tool, print the result as JSON"""
+    args = _parser().parse_args(argv)
+    if args.concurrency < 1:
+        print("--concurrency must be at least 1", file=sys.stderr)
+        return 2
+    try:
+        result = asyncio.run(_main(args))
+    except (UnexpectedException, asyncio.TimeoutError) as err:
+        print(f"error: {err or type(err).__name__}", file=sys.stderr)
+        return 1
+    json.dump(result, sys.stdout, indent=2)
+    print()
+    return 0
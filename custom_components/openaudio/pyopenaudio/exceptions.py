@@ -0,0 +1,9 @@
+"""Exceptions"""
+
+
+class UnexpectedException(Exception):
+    """Unexpected error"""
+
+
+class CircuitOpenException(UnexpectedException):
+    """Request not sent, the host is known to be unavailable"""
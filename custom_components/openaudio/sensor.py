@@ -1,20 +1,26 @@
+from __future__ import annotations
+
 import logging
 
+from collections.abc import Callable
+from functools import partial
+
 from homeassistant.components.sensor import SensorEntity
 from homeassistant.components.sensor.const import SensorDeviceClass, SensorStateClass
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import (
     SIGNAL_STRENGTH_DECIBELS_MILLIWATT,
+    UnitOfInformation,
     UnitOfTime,
     PERCENTAGE,
 )
 from homeassistant.core import HomeAssistant, callback
-from homeassistant.helpers.entity import DeviceInfo, EntityCategory
+from homeassistant.helpers.entity import EntityCategory
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
-from .const import DOMAIN
-from .hub import OpenAudioHub, OpenAudioDevice
+from .const import DOMAIN, SECTION_METRICS, TIER_DEVICES, TIER_METRICS, TIER_ZONES
+from .entity import OpenAudioEntity, async_track_entities
+from .hub import OpenAudioChanges, OpenAudioHub, OpenAudioDevice
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -27,44 +33,92 @@ async def async_setup_entry(
     """Setup the config entry for my device."""
 
     hub: OpenAudioHub = hass.data[DOMAIN][config_entry.entry_id]["hub"]
-    coordinator = hass.data[DOMAIN][config_entry.entry_id]["coordinator"]
-
-    entities = []
-
-    for amp_id in hub.openaudios:
-        amp = hub.openaudios[amp_id]
-        #entities.append(SignalStrength(amp, coordinator, config_entry))
-        #entities.append(ConnectionType(amp, coordinator, config_entry))
-        entities.append(SSID(amp, coordinator, config_entry))
-        entities.append(Uptime(amp, coordinator, config_entry))
-        entities.append(CpuUsage(amp, coordinator, config_entry))
-        entities.append(DiskUsage(amp, coordinator, config_entry))
-        entities.append(RamUsage(amp, coordinator, config_entry))
+    coordinators = hass.data[DOMAIN][config_entry.entry_id]["coordinators"]
 
-    if entities:
-        async_add_entities(entities)
-
-
-class OpenAudioSensorBase(CoordinatorEntity, SensorEntity):
+    @callback
+    def _describe_entities() -> dict[str, Callable[[], SensorEntity]]:
+        entities = {}
+        for amp_id in hub.topology.devices:
+            amp = hub.openaudios[amp_id]
+            # Each sensor subscribes to the refresh tier of the data it reads
+            #entities[f"{amp_id}_signal_strength"] = partial(SignalStrength, amp, coordinators[SignalStrength.tier], config_entry)
+            #entities[f"{amp_id}_connection_type"] = partial(ConnectionType, amp, coordinators[ConnectionType.tier], config_entry)
+            for sensor in (SSID, Uptime, CpuUsage, DiskUsage, RamUsage):
+                entities[f"{amp_id}_{sensor.__name__}"] = partial(
+                    sensor,
+                    amp,
+                    coordinators[sensor.tier],
+                    config_entry,
+                    coordinators[TIER_DEVICES],
+                )
+
+        if (amp := hub.server_device) is not None:
+            for sensor in (
+                PollInterval,
+                PollDuration,
+                EntityWrites,
+                ApiRequests,
+                ApiErrors,
+                ApiLatency,
+                BytesReceived,
+            ):
+                entities[f"{amp.device_id}_{sensor.__name__}"] = partial(
+                    sensor, amp, coordinators[sensor.tier], config_entry
+                )
+        return entities
+
+    # Devices come and go with the devices tier
+    async_track_entities(
+        hass,
+        config_entry,
+        (coordinators[TIER_DEVICES],),
+        async_add_entities,
+        _describe_entities,
+    )
+
+
+class OpenAudioSensorBase(OpenAudioEntity, SensorEntity):
     """Base class for our sensors"""
 
-    _attr_has_entity_name = True
-
-    def __init__(self, amp: OpenAudioDevice, coordinator, config_entry) -> None:
-        """Initialize the sensor."""
-        super().__init__(
-            coordinator,
-        )
-        self._amp = amp
-        self._config_entry = config_entry
+    # Refresh tier of the data the sensor reads
+    tier = TIER_METRICS
+
+    def __init__(
+        self, amp: OpenAudioDevice, coordinator, config_entry, devices_coordinator=None
+    ) -> None:
+        """Initialize the sensor.
+
+        /devices/info and pushed device events carry the metrics and
+        connection info too, sensors of the metrics tier pass the devices
+        coordinator to also show what those changed.
+        """
+        super().__init__(amp, coordinator, config_entry)
+        self._devices_coordinator = devices_coordinator
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        if self._devices_coordinator not in (None, self.coordinator):
+            self.async_on_remove(
+                self._devices_coordinator.async_add_listener(
+                    self._handle_devices_update
+                )
+            )
+
+    def _is_changed(self, changes: OpenAudioChanges) -> bool:
+        """Return True if the poll changed data this sensor shows"""
+        return self._amp.device_id in changes.devices
 
     @property
-    def device_info(self) -> DeviceInfo:
-        return self._amp.device_info
+    def _sections(self) -> tuple[str, ...]:
+        """Sections of the hub data the sensor shows"""
+        return (f"{SECTION_METRICS}/{self._amp.device_id}",)
 
     @callback
-    def _handle_coordinator_update(self) -> None:
-        self.async_write_ha_state()
+    def _handle_devices_update(self) -> None:
+        changes: OpenAudioChanges | None = self._devices_coordinator.data
+        if changes is None or not self._exists or not self._is_changed(changes):
+            return
+        self._async_write_state()
 
 
 class SignalStrength(OpenAudioSensorBase):
@@ -216,3 +270,188 @@ class RamUsage(OpenAudioSensorBase):
     @property
     def name(self) -> str:
         return "RAM Usage"
+
+
+class OpenAudioHubSensorBase(OpenAudioSensorBase):
+    """Base class for sensors about the integration itself
+
+    They are attached to the device serving the API and only write their
+    state when the value they show changed.
+    """
+
+    tier = TIER_ZONES
+    entity_category = EntityCategory.DIAGNOSTIC
+    _sections = ()
+
+    def __init__(self, amp: OpenAudioDevice, coordinator, config_entry) -> None:
+        """Initialize the sensor."""
+        super().__init__(amp, coordinator, config_entry)
+        self._shown_value = None
+
+    def _is_changed(self, changes: OpenAudioChanges) -> bool:
+        return self.native_value != self._shown_value
+
+    @callback
+    def async_write_ha_state(self) -> None:
+        self._shown_value = self.native_value
+        super().async_write_ha_state()
+
+
+class PollInterval(OpenAudioHubSensorBase):
+    """Effective interval of the adaptive zone polling"""
+
+    device_class = SensorDeviceClass.DURATION
+    native_unit_of_measurement = UnitOfTime.SECONDS
+    icon = "mdi:timer-sync-outline"
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        # Commands and the push channel change the interval between polls
+        self.async_on_remove(
+            self.coordinator.async_add_interval_listener(self._handle_interval_update)
+        )
+
+    @callback
+    def _handle_interval_update(self) -> None:
+        if self._exists and self.native_value != self._shown_value:
+            self._async_write_state()
+
+    @property
+    def unique_id(self) -> str:
+        return f"{self._amp.uid_base}_poll_interval"
+
+    @property
+    def native_value(self):
+        if self.coordinator.update_interval is None:
+            return None
+        return self.coordinator.update_interval.total_seconds()
+
+    @property
+    def name(self) -> str:
+        return "Poll Interval"
+
+
+class PollDuration(OpenAudioHubSensorBase):
+    """Duration of the last zone poll"""
+
+    device_class = SensorDeviceClass.DURATION
+    state_class = SensorStateClass.MEASUREMENT
+    native_unit_of_measurement = UnitOfTime.MILLISECONDS
+    icon = "mdi:timer-outline"
+
+    @property
+    def unique_id(self) -> str:
+        return f"{self._amp.uid_base}_poll_duration"
+
+    @property
+    def native_value(self):
+        duration = self._amp.hub.poll_stats[TIER_ZONES].last_duration
+        if duration is None:
+            return None
+        return round(duration * 1000)
+
+    @property
+    def name(self) -> str:
+        return "Poll Duration"
+
+
+class EntityWrites(OpenAudioHubSensorBase):
+    """Entity states written after the last zone poll"""
+
+    state_class = SensorStateClass.MEASUREMENT
+    icon = "mdi:pencil-outline"
+
+    @property
+    def unique_id(self) -> str:
+        return f"{self._amp.uid_base}_entity_writes"
+
+    @property
+    def native_value(self):
+        return self._amp.hub.poll_stats[TIER_ZONES].last_entity_writes
+
+    @property
+    def name(self) -> str:
+        return "Entity Writes per Poll"
+
+
+class ApiRequests(OpenAudioHubSensorBase):
+    """Requests made to the API"""
+
+    state_class = SensorStateClass.TOTAL_INCREASING
+    icon = "mdi:swap-horizontal"
+
+    @property
+    def unique_id(self) -> str:
+        return f"{self._amp.uid_base}_api_requests"
+
+    @property
+    def native_value(self):
+        return self._amp.hub.request_stats.requests
+
+    @property
+    def name(self) -> str:
+        return "API Requests"
+
+
+class ApiErrors(OpenAudioHubSensorBase):
+    """Requests to the API that failed"""
+
+    state_class = SensorStateClass.TOTAL_INCREASING
+    icon = "mdi:alert-circle-outline"
+
+    @property
+    def unique_id(self) -> str:
+        return f"{self._amp.uid_base}_api_errors"
+
+    @property
+    def native_value(self):
+        return self._amp.hub.request_stats.errors
+
+    @property
+    def name(self) -> str:
+        return "API Errors"
+
+
+class ApiLatency(OpenAudioHubSensorBase):
+    """Mean response time of the API"""
+
+    device_class = SensorDeviceClass.DURATION
+    state_class = SensorStateClass.MEASUREMENT
+    native_unit_of_measurement = UnitOfTime.MILLISECONDS
+    icon = "mdi:timer-sand"
+
+    @property
+    def unique_id(self) -> str:
+        return f"{self._amp.uid_base}_api_latency"
+
+    @property
+    def native_value(self):
+        mean = self._amp.hub.request_stats.latency.mean
+        if mean is None:
+            return None
+        return round(mean * 1000, 1)
+
+    @property
+    def name(self) -> str:
+        return "API Latency"
+
+
+class BytesReceived(OpenAudioHubSensorBase):
+    """Bytes received from the API"""
+
+    device_class = SensorDeviceClass.DATA_SIZE
+    state_class = SensorStateClass.TOTAL_INCREASING
+    native_unit_of_measurement = UnitOfInformation.BYTES
+    icon = "mdi:download-network-outline"
+
+    @property
+    def unique_id(self) -> str:
+        return f"{self._amp.uid_base}_bytes_received"
+
+    @property
+    def native_value(self):
+        return self._amp.hub.request_stats.bytes_received
+
+    @property
+    def name(self) -> str:
+        return "Bytes Received"
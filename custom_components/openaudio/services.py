@@ -0,0 +1,152 @@
+"""Services for the OpenAudio integration."""
+from __future__ import annotations
+
+import asyncio
+
+import voluptuous as vol
+
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
+import homeassistant.helpers.config_validation as cv
+
+from .const import (
+    ATTR_COUNT,
+    ATTR_CPROFILE,
+    ATTR_INPUT,
+    ATTR_TOP,
+    ATTR_TRACEMALLOC,
+    ATTR_VOLUME,
+    ATTR_ZONE_ID,
+    ATTR_ZONES,
+    DOMAIN,
+    LOGGER,
+    SERVICE_APPLY_ZONES,
+    SERVICE_PROFILE,
+    TIER_ZONES,
+)
+from .profiler import OpenAudioProfiler
+
+ZONE_TARGET_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_ZONE_ID): cv.string,
+        vol.Optional(ATTR_VOLUME): vol.All(vol.Coerce(int), vol.Range(min=0, max=100)),
+        vol.Optional(ATTR_INPUT): vol.Any(None, cv.string),
+    }
+)
+
+
+def _unique_zones(targets: list[dict]) -> list[dict]:
+    """Reject a zone targeted twice, the response has one result per zone"""
+    seen = set()
+    for target in targets:
+        if (zone_id := target[ATTR_ZONE_ID]) in seen:
+            raise vol.Invalid(f"Zone {zone_id} is targeted more than once")
+        seen.add(zone_id)
+    return targets
+
+
+APPLY_ZONES_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_ZONES): vol.All(
+            cv.ensure_list, [ZONE_TARGET_SCHEMA], _unique_zones
+        ),
+    }
+)
+
+PROFILE_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_COUNT, default=10): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=1000)
+        ),
+        vol.Optional(ATTR_CPROFILE, default=True): cv.boolean,
+        vol.Optional(ATTR_TRACEMALLOC, default=False): cv.boolean,
+        vol.Optional(ATTR_TOP, default=15): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=200)
+        ),
+    }
+)
+
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the OpenAudio services."""
+
+    async def async_apply_zones(call: ServiceCall) -> ServiceResponse:
+        """Apply volume and input targets to many zones at once."""
+        results: dict[str, dict] = {}
+        targets_by_entry: dict[str, list[dict]] = {}
+
+        for target in call.data[ATTR_ZONES]:
+            zone_id = target[ATTR_ZONE_ID]
+            for entry_id, data in hass.data.get(DOMAIN, {}).items():
+                if data["hub"].has_zone(zone_id):
+                    targets_by_entry.setdefault(entry_id, []).append(target)
+                    break
+            else:
+                results[zone_id] = {"success": False, "error": "Unknown zone"}
+
+        async def apply(entry_id: str, targets: list[dict]) -> None:
+            data = hass.data[DOMAIN][entry_id]
+            errors = await data["hub"].apply_zones(targets)
+            for zone_id, error in errors.items():
+                if error is None:
+                    results[zone_id] = {"success": True}
+                else:
+                    LOGGER.warning("Failed to apply targets to zone %s: %s", zone_id, error)
+                    results[zone_id] = {"success": False, "error": str(error) or repr(error)}
+            # One refresh for the whole batch
+            await data["coordinators"][TIER_ZONES].async_refresh()
+
+        await asyncio.gather(
+            *(apply(entry_id, targets) for entry_id, targets in targets_by_entry.items())
+        )
+
+        if call.return_response:
+            return {ATTR_ZONES: results}
+        return None
+
+    async def async_profile(call: ServiceCall) -> None:
+        """Profile the next refreshes and commands of every hub."""
+        hubs = [data["hub"] for data in hass.data.get(DOMAIN, {}).values()]
+        if not hubs:
+            raise HomeAssistantError("No OpenAudio system is set up")
+        if any(hub.profiler is not None for hub in hubs):
+            raise HomeAssistantError("A profile is already running")
+
+        profiler = OpenAudioProfiler(
+            hass,
+            call.data[ATTR_COUNT],
+            call.data[ATTR_CPROFILE],
+            call.data[ATTR_TRACEMALLOC],
+            call.data[ATTR_TOP],
+        )
+
+        @callback
+        def _async_detach() -> None:
+            for hub in hubs:
+                if hub.profiler is profiler:
+                    hub.profiler = None
+
+        # Raises when another profiler is running, nothing is attached yet
+        profiler.async_start()
+        profiler.async_on_stop(_async_detach)
+        for hub in hubs:
+            hub.profiler = profiler
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_PROFILE, async_profile, schema=PROFILE_SCHEMA
+    )
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_APPLY_ZONES,
+        async_apply_zones,
+        schema=APPLY_ZONES_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
@@ -0,0 +1,40 @@
+"""Helpers of the OpenAudio tests"""
+from __future__ import annotations
+
+import asyncio
+
+from homeassistant.const import CONF_HOST
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.openaudio.const import CONF_PUSH_UPDATES, DOMAIN
+
+from .standin import StandInApi
+
+
+async def setup_entry(
+    hass: HomeAssistant, api: StandInApi, **options
+) -> MockConfigEntry:
+    """Set up a config entry of the stand-in API, push updates off by default"""
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={CONF_HOST: api.host, CONF_PUSH_UPDATES: False, **options},
+    )
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    # Wait for the refresh setup left to the background
+    hub = hass.data[DOMAIN][entry.entry_id]["hub"]
+    async with asyncio.timeout(5):
+        while "complete" not in hub.setup_timings:
+            await asyncio.sleep(0.01)
+    await hass.async_block_till_done()
+    return entry
+
+
+async def refresh(hass: HomeAssistant, entry: MockConfigEntry, *tiers: str) -> None:
+    """Refresh tiers one after the other"""
+    coordinators = hass.data[DOMAIN][entry.entry_id]["coordinators"]
+    for tier in tiers:
+        await coordinators[tier].async_refresh()
+        await hass.async_block_till_done()
@@ -0,0 +1,30 @@
+"""Fixtures of the OpenAudio tests"""
+from __future__ import annotations
+
+import pytest
+
+from custom_components.openaudio.hub import OpenAudioHub
+
+from .standin import StandInApi
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(enable_custom_integrations):
+    """Load the integration from custom_components"""
+    yield
+
+
+@pytest.fixture
+async def api(socket_enabled):
+    """A running stand-in API with one device"""
+    async with StandInApi() as api:
+        yield api
+
+
+@pytest.fixture
+async def hub(hass, api):
+    """A hub connected to the stand-in API"""
+    hub = OpenAudioHub(hass, api.host)
+    assert await hub.verify_connection()
+    yield hub
+    await hub.async_close()
@@ -0,0 +1,369 @@
+"""Stand-in for the OpenAudio v3 API
+
+Serves a synthetic system of N devices with M zones and K inputs each,
+with configurable per-request latency, jitter and error rate. Used by the
+tests and by the benchmarks under bench/.
+
+    async with StandInApi(devices=2, zones=8, inputs=4) as api:
+        hub = OpenAudioHub(hass, api.host)
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import random
+
+from collections import Counter
+
+from aiohttp import WSMsgType, web
+
+API = "/api/v3"
+INPUT_TYPES = ["Airplay", "Spotify", "DLNA", "Bluetooth", "RCA", "Optical"]
+
+
+class StandInApi:
+    """aiohttp server answering like an OpenAudio system
+
+    etags: answer with an ETag and 304 Not Modified when it matches,
+    otherwise every GET returns the full body.
+    bulk_inputs: include the per-input records in /inputs/info, older
+    firmware only reports the input ids.
+    latency, jitter: seconds each request is delayed by, latency plus or
+    minus up to jitter.
+    error_rate: share of the requests answered with a 500.
+
+    The knobs can be changed while the server runs, down answers every
+    request with a 503, the routes in failing, e.g.
+    "GET /api/v3/inputs/info", are answered with a 500.
+    """
+
+    def __init__(
+        self,
+        devices: int = 1,
+        zones: int = 4,
+        inputs: int = 2,
+        *,
+        etags: bool = True,
+        bulk_inputs: bool = True,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        seed: int = 0,
+    ) -> None:
+        self.etags = etags
+        self.bulk_inputs = bulk_inputs
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.down = False
+        self.failing: set[str] = set()
+        self._random = random.Random(seed)
+        self._zones_per_device = zones
+        self._inputs_per_device = inputs
+        self._next_device = 1
+        self._removed: dict[str, dict] = {}
+
+        self.devices: dict[str, dict] = {}
+        self.zones: dict[str, dict] = {}
+        self.inputs: dict[str, dict] = {}
+        for _ in range(devices):
+            self.add_device()
+
+        # Requests served, by method and route, and the PUTs in order
+        self.requests: Counter[str] = Counter()
+        self.puts: list[tuple[str, dict]] = []
+        self.bytes_sent = 0
+        self._websockets: set[web.WebSocketResponse] = set()
+        self._runner: web.AppRunner | None = None
+        self.host = ""
+
+    async def __aenter__(self) -> StandInApi:
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.stop()
+
+    async def start(self) -> None:
+        """Listen on a free port of 127.0.0.1, see host"""
+        app = web.Application(middlewares=[self._middleware])
+        app.add_routes(
+            [
+                web.get(f"{API}/devices/", self._devices),
+                web.get(f"{API}/devices/info", self._devices_info),
+                web.get(f"{API}/devices/server", self._server_device),
+                web.get(f"{API}/devices/{{device_id}}/metrics", self._metrics),
+                web.get(f"{API}/devices/{{device_id}}/connection", self._connection),
+                web.get(f"{API}/devices/{{device_id}}/attributes", self._attributes),
+                web.get(f"{API}/devices/{{device_id}}/config", self._config),
+                web.get(f"{API}/zones", self._zone_ids),
+                web.get(f"{API}/zones/info", self._zones_info),
+                web.get(f"{API}/zones/{{zone_id}}", self._zone),
+                web.put(f"{API}/zones/{{zone_id}}/volume", self._put_zone_volume),
+                web.put(f"{API}/zones/{{zone_id}}/input", self._put_zone_input),
+                web.get(f"{API}/inputs/", self._input_ids),
+                web.get(f"{API}/inputs/info", self._inputs_info),
+                web.get(f"{API}/inputs/{{input_id}}", self._input),
+                web.get(
+                    f"{API}/inputs/{{input_id}}/available-types", self._available_types
+                ),
+                web.put(f"{API}/inputs/{{input_id}}/volume", self._put_input_volume),
+                web.put(f"{API}/inputs/{{input_id}}/type", self._put_input_type),
+                web.put(f"{API}/inputs/{{input_id}}/enable", self._put_input_enable),
+                web.get(f"{API}/events", self._events),
+            ]
+        )
+        self._runner = web.AppRunner(app, handle_signals=False)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.host = f"127.0.0.1:{port}"
+
+    async def stop(self) -> None:
+        """Close the event channels and stop listening"""
+        await self.close_events()
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    # Topology and state
+
+    def add_device(self) -> str:
+        """Add a device with its zones and inputs, return its id"""
+        number = self._next_device
+        self._next_device += 1
+        device_id = f"amp{number}"
+        self.devices[device_id] = {
+            "device_id": device_id,
+            "config": {"name": f"Amp {number}"},
+            "attributes": {
+                "serial_number": f"OA{number:06d}",
+                "firmware_version": "1.15.40",
+            },
+            "connection": {
+                "type": "wifi",
+                "ssid": "openaudio",
+                "signal_strength": -55,
+                "uptime": 3600,
+            },
+            "metrics": {"cpu_usage": 12.5, "ram_usage": 40.0, "disk_usage": 21.0},
+        }
+        input_ids = []
+        for index in range(1, self._inputs_per_device + 1):
+            input_id = f"{device_id}-in{index}"
+            input_ids.append(input_id)
+            self.inputs[input_id] = {
+                "input_id": input_id,
+                "device_id": device_id,
+                "name": f"Input {index}",
+                "input_class": 0,
+                "input_type": INPUT_TYPES[index % len(INPUT_TYPES)],
+                "available_types": INPUT_TYPES,
+                "volume": 50,
+                "enabled": True,
+            }
+        for index in range(1, self._zones_per_device + 1):
+            zone_id = f"{device_id}-{index}"
+            active_input = input_ids[index % len(input_ids)] if input_ids else None
+            self.zones[zone_id] = {
+                "zone_id": zone_id,
+                "device_id": device_id,
+                "name": f"Zone {index}",
+                "volume": 30,
+                "enabled": True,
+                "active_input": active_input,
+                "input": [active_input] if active_input else [],
+            }
+        return device_id
+
+    def remove_device(self, device_id: str) -> None:
+        """Remove a device with its zones and inputs, see restore_device"""
+        removed = {"device": self.devices.pop(device_id), "zones": {}, "inputs": {}}
+        for section, records in (("zones", self.zones), ("inputs", self.inputs)):
+            for item_id in [
+                item_id
+                for item_id, record in records.items()
+                if record["device_id"] == device_id
+            ]:
+                removed[section][item_id] = records.pop(item_id)
+        self._removed[device_id] = removed
+
+    def restore_device(self, device_id: str) -> None:
+        """Bring back a device removed earlier"""
+        removed = self._removed.pop(device_id)
+        self.devices[device_id] = removed["device"]
+        self.zones.update(removed["zones"])
+        self.inputs.update(removed["inputs"])
+
+    async def push(self, event) -> None:
+        """Send an event to every connected event channel"""
+        for websocket in list(self._websockets):
+            await websocket.send_str(json.dumps(event))
+
+    async def close_events(self) -> None:
+        """Close every event channel, e.g. to test reconnects"""
+        for websocket in list(self._websockets):
+            await websocket.close()
+
+    @property
+    def event_channels(self) -> int:
+        """Number of connected event channels"""
+        return len(self._websockets)
+
+    def reset_counters(self) -> None:
+        """Forget the requests served so far"""
+        self.requests.clear()
+        self.puts.clear()
+        self.bytes_sent = 0
+
+    # Serving
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler) -> web.StreamResponse:
+        route = request.match_info.route.resource
+        name = f"{request.method} {route.canonical if route is not None else request.path}"
+        self.requests[name] += 1
+
+        delay = self.latency + self._random.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self.down:
+            return web.Response(status=503)
+        if name in self.failing or (
+            self.error_rate and self._random.random() < self.error_rate
+        ):
+            return web.Response(status=500)
+
+        data = await handler(request)
+        if isinstance(data, web.StreamResponse):
+            return data
+        body = json.dumps(data).encode()
+        headers = {"Content-Type": "application/json"}
+        if self.etags and request.method == "GET":
+            etag = f'"{hashlib.sha1(body).hexdigest()}"'
+            headers["ETag"] = etag
+            if request.headers.get("If-None-Match") == etag:
+                return web.Response(status=304, headers=headers)
+        self.bytes_sent += len(body)
+        return web.Response(body=body, headers=headers)
+
+    def _device(self, request: web.Request) -> dict:
+        device = self.devices.get(request.match_info["device_id"])
+        if device is None:
+            raise web.HTTPNotFound()
+        return device
+
+    def _zone_record(self, request: web.Request) -> dict:
+        zone = self.zones.get(request.match_info["zone_id"])
+        if zone is None:
+            raise web.HTTPNotFound()
+        return zone
+
+    def _input_record(self, request: web.Request) -> dict:
+        record = self.inputs.get(request.match_info["input_id"])
+        if record is None:
+            raise web.HTTPNotFound()
+        return record
+
+    async def _devices(self, request: web.Request):
+        return {"device_ids": list(self.devices)}
+
+    async def _devices_info(self, request: web.Request):
+        return list(self.devices.values())
+
+    async def _server_device(self, request: web.Request):
+        return {"device_ids": list(self.devices)[:1]}
+
+    async def _metrics(self, request: web.Request):
+        return self._device(request)["metrics"]
+
+    async def _connection(self, request: web.Request):
+        return self._device(request)["connection"]
+
+    async def _attributes(self, request: web.Request):
+        return self._device(request)["attributes"]
+
+    async def _config(self, request: web.Request):
+        return self._device(request)["config"]
+
+    async def _zone_ids(self, request: web.Request):
+        return {"zone_ids": list(self.zones)}
+
+    async def _zones_info(self, request: web.Request):
+        return list(self.zones.values())
+
+    async def _zone(self, request: web.Request):
+        return self._zone_record(request)
+
+    async def _put_zone_volume(self, request: web.Request):
+        zone = self._zone_record(request)
+        payload = await request.json()
+        self.puts.append((request.path, payload))
+        zone["volume"] = payload["volume"]
+        return {"volume": zone["volume"]}
+
+    async def _put_zone_input(self, request: web.Request):
+        zone = self._zone_record(request)
+        payload = await request.json()
+        self.puts.append((request.path, payload))
+        zone["input"] = payload["input_ids"]
+        zone["active_input"] = payload["input_ids"][0] if payload["input_ids"] else None
+        return {"input_ids": zone["input"]}
+
+    async def _input_ids(self, request: web.Request):
+        return {"input_ids": list(self.inputs)}
+
+    async def _inputs_info(self, request: web.Request):
+        info = {"input_ids": list(self.inputs)}
+        if self.bulk_inputs:
+            info["inputs"] = [
+                {
+                    "input_id": record["input_id"],
+                    "device_id": record["device_id"],
+                    "volume": record["volume"],
+                    "enabled": record["enabled"],
+                }
+                for record in self.inputs.values()
+            ]
+        return info
+
+    async def _input(self, request: web.Request):
+        return self._input_record(request)
+
+    async def _available_types(self, request: web.Request):
+        return {"available_types": self._input_record(request)["available_types"]}
+
+    async def _put_input_volume(self, request: web.Request):
+        record = self._input_record(request)
+        payload = await request.json()
+        self.puts.append((request.path, payload))
+        record["volume"] = payload["volume"]
+        return {"volume": record["volume"]}
+
+    async def _put_input_type(self, request: web.Request):
+        record = self._input_record(request)
+        payload = await request.json()
+        self.puts.append((request.path, payload))
+        record["input_type"] = payload["type"]
+        return {"type": record["input_type"]}
+
+    async def _put_input_enable(self, request: web.Request):
+        record = self._input_record(request)
+        payload = await request.json()
+        self.puts.append((request.path, payload))
+        record["enabled"] = payload["enable"]
+        return {"enabled": record["enabled"]}
+
+    async def _events(self, request: web.Request) -> web.WebSocketResponse:
+        websocket = web.WebSocketResponse(heartbeat=30)
+        await websocket.prepare(request)
+        self._websockets.add(websocket)
+        try:
+            async for message in websocket:
+                if message.type == WSMsgType.ERROR:
+                    break
+        finally:
+            self._websockets.discard(websocket)
+        return websocket
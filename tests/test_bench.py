@@ -0,0 +1,94 @@
+"""The benchmarks run against the stand-in API"""
+from __future__ import annotations
+
+import argparse
+
+from bench import decode, entity_writes, poll, startup
+
+
+async def test_poll_benchmark(socket_enabled) -> None:
+    """A short poll benchmark reports requests and timings"""
+    args = argparse.Namespace(
+        devices=2,
+        zones=3,
+        inputs=2,
+        latency=0.0,
+        jitter=0.0,
+        error_rate=0.0,
+        etags=True,
+        polls=3,
+        commands=3,
+        max_concurrent_requests=4,
+        output=None,
+    )
+    results = await poll.run(args)
+
+    assert results["zones"] == 6
+    assert results["cold_poll"]["failures"] == 0
+    # Nothing changed, the bulk endpoints answer 304
+    assert results["steady_polls"]["requests_per_poll"] < results["cold_poll"]["requests_per_poll"]
+    # The pool of the cold poll is kept alive
+    assert 0 < results["cold_poll"]["connections_opened_per_poll"] <= 4
+    assert results["steady_polls"]["connections_opened_per_poll"] == 0
+    assert results["steady_polls"]["connections_reused_per_poll"] > 0
+    assert results["commands"]["round_trip"]["count"] == 3
+
+
+async def test_startup_benchmark(socket_enabled) -> None:
+    """A restart is set up from the snapshot of the fresh install"""
+    args = argparse.Namespace(
+        devices=1,
+        zones=2,
+        inputs=2,
+        latency=0.0,
+        jitter=0.0,
+        error_rate=0.0,
+        etags=True,
+        runs=1,
+        output=None,
+    )
+    results = await startup.run(args)
+
+    assert results["fresh_install"]["topology"]["count"] == 1
+    assert results["fresh_install"]["complete"]["count"] == 1
+    # The restart doesn't wait for the topology
+    assert "topology" not in results["restart"]
+    assert results["restart"]["entities_ready"]["count"] == 1
+
+
+async def test_entity_writes_benchmark(socket_enabled) -> None:
+    """Every kind of entity gets timed"""
+    args = argparse.Namespace(
+        devices=1,
+        zones=2,
+        inputs=2,
+        latency=0.0,
+        jitter=0.0,
+        error_rate=0.0,
+        etags=True,
+        writes=2,
+        repeats=1,
+        output=None,
+    )
+    results = await entity_writes.run(args)
+
+    assert results["zones"]["entities"] == 2
+    assert results["inputs"]["entities"] == 2
+    assert results["sensors"]["entities"]
+    assert results["legacy_zones"]["entities"] == 2
+    assert results["legacy_inputs"]["entities"] == 2
+    for kind in ("zones", "legacy_zones"):
+        assert results[kind]["properties"]["min_us"] > 0
+        assert results[kind]["write"]["min_us"] > 0
+
+
+def test_decode_benchmark() -> None:
+    """Every decoder is timed on payloads of the requested sizes"""
+    args = argparse.Namespace(sizes=[4, 20], number=2, repeats=1, output=None)
+    results = decode.run(args)
+
+    assert set(results["zones"]) == {"4", "20"}
+    assert results["zones"]["20"]["bytes"] > results["zones"]["4"]["bytes"]
+    for timings in results["zones"].values():
+        assert timings["client"]["us"] > 0
+        assert timings["json_text"]["us"] > 0
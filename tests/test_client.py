@@ -0,0 +1,233 @@
+"""OpenAudioClient against the stand-in API"""
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from custom_components.openaudio.pyopenaudio import (
+    CircuitOpenException,
+    OpenAudioClient,
+    UnexpectedException,
+    request_deadline,
+)
+from custom_components.openaudio.pyopenaudio import client as client_module
+
+from .standin import StandInApi
+
+ZONES_INFO = "GET /api/v3/zones/info"
+ZONE_VOLUME = "PUT /api/v3/zones/{zone_id}/volume"
+
+
+@pytest.fixture
+def backoffs(monkeypatch) -> list[tuple[float, float]]:
+    """Bounds of the jittered backoff delays drawn, the delays are 0"""
+    drawn = []
+
+    def uniform(low: float, high: float) -> float:
+        drawn.append((low, high))
+        return 0.0
+
+    monkeypatch.setattr(client_module.random, "uniform", uniform)
+    return drawn
+
+
+@pytest.fixture
+async def client():
+    """A client closed after the test"""
+    client = OpenAudioClient()
+    yield client
+    await client.close()
+
+
+async def test_conditional_get_with_etags(client, socket_enabled) -> None:
+    """Devices sending ETags answer an unchanged payload with 304"""
+    async with StandInApi(etags=True) as api:
+        assert await client.get_zones_info(api.host, only_if_changed=True)
+        sent = api.bytes_sent
+
+        assert await client.get_zones_info(api.host, only_if_changed=True) is None
+        assert client.stats.not_modified == 1
+        assert api.bytes_sent == sent
+
+        api.zones["amp1-1"]["volume"] = 55
+        zones = await client.get_zones_info(api.host, only_if_changed=True)
+        assert zones[0]["volume"] == 55
+        assert client.stats.not_modified == 1
+
+
+async def test_conditional_get_without_etags(client, socket_enabled) -> None:
+    """Without ETags an unchanged payload is told apart by its hash"""
+    async with StandInApi(etags=False) as api:
+        assert await client.get_zones_info(api.host, only_if_changed=True)
+        sent = api.bytes_sent
+
+        assert await client.get_zones_info(api.host, only_if_changed=True) is None
+        assert client.stats.not_modified == 0
+        assert api.bytes_sent > sent
+
+        api.zones["amp1-1"]["volume"] = 55
+        zones = await client.get_zones_info(api.host, only_if_changed=True)
+        assert zones[0]["volume"] == 55
+
+
+@pytest.mark.parametrize("etags", [True, False])
+async def test_reset_validators(client, socket_enabled, etags: bool) -> None:
+    """After reset_validators an unchanged payload is returned again"""
+    async with StandInApi(etags=etags) as api:
+        first = await client.get_zones_info(api.host, only_if_changed=True)
+        assert await client.get_zones_info(api.host, only_if_changed=True) is None
+
+        client.reset_validators()
+        assert await client.get_zones_info(api.host, only_if_changed=True) == first
+
+
+async def test_plain_get_ignores_validators(client, socket_enabled) -> None:
+    """Without only_if_changed every GET returns the payload"""
+    async with StandInApi() as api:
+        await client.get_zones_info(api.host, only_if_changed=True)
+        assert await client.get_zones_info(api.host)
+        assert api.requests[ZONES_INFO] == 2
+        assert client.stats.not_modified == 0
+
+
+async def test_get_retried_with_backoff(client, socket_enabled, backoffs, monkeypatch) -> None:
+    """A failing GET is tried retry_attempts times, the backoff doubles up to a cap"""
+    monkeypatch.setattr(client_module, "retry_attempts", 5)
+    monkeypatch.setattr(client_module, "retry_base_delay", 0.5)
+    monkeypatch.setattr(client_module, "retry_max_delay", 1.5)
+    monkeypatch.setattr(client_module, "breaker_failure_threshold", 10)
+    async with StandInApi() as api:
+        api.down = True
+        with pytest.raises(UnexpectedException):
+            await client.get_zones_info(api.host)
+        assert api.requests[ZONES_INFO] == 5
+        assert backoffs == [(0, 0.5), (0, 1.0), (0, 1.5), (0, 1.5)]
+
+
+async def test_get_retry_recovers(client, socket_enabled, monkeypatch) -> None:
+    """A GET failing once returns the payload of the retry"""
+    async with StandInApi() as api:
+
+        def uniform(low: float, high: float) -> float:
+            api.down = False
+            return 0.0
+
+        monkeypatch.setattr(client_module.random, "uniform", uniform)
+        api.down = True
+        assert await client.get_zones_info(api.host)
+        assert api.requests[ZONES_INFO] == 2
+        assert client.breaker_states()[api.host]["failures"] == 0
+
+
+@pytest.mark.parametrize("error_rate", [1.0, 0.0])
+async def test_put_never_retried(
+    client, socket_enabled, backoffs, error_rate: float
+) -> None:
+    """PUTs aren't idempotent, a failed one is sent once"""
+    async with StandInApi(error_rate=error_rate) as api:
+        api.down = not error_rate
+        with pytest.raises(UnexpectedException):
+            await client.set_zone_volume(api.host, "amp1-1", 40)
+        assert api.requests[ZONE_VOLUME] == 1
+        assert not backoffs
+
+
+async def test_circuit_breaker(client, socket_enabled, backoffs, monkeypatch) -> None:
+    """The breaker opens on failures, fails fast, probes and closes again"""
+    monkeypatch.setattr(client_module, "retry_attempts", 1)
+    monkeypatch.setattr(client_module, "breaker_failure_threshold", 2)
+    async with StandInApi() as api:
+        api.down = True
+        for _ in range(2):
+            with pytest.raises(UnexpectedException):
+                await client.get_zones_info(api.host)
+        assert client.breaker_states()[api.host]["state"] == "open"
+
+        # Open: nothing reaches the host until breaker_reset_timeout passed
+        with pytest.raises(CircuitOpenException):
+            await client.get_zones_info(api.host)
+        with pytest.raises(CircuitOpenException):
+            await client.set_zone_volume(api.host, "amp1-1", 40)
+        assert api.requests[ZONES_INFO] == 2
+        assert api.requests[ZONE_VOLUME] == 0
+
+        # Half open: a failed probe opens the breaker again
+        monkeypatch.setattr(client_module, "breaker_reset_timeout", 0)
+        with pytest.raises(UnexpectedException) as failed_probe:
+            await client.get_zones_info(api.host)
+        assert not isinstance(failed_probe.value, CircuitOpenException)
+        assert client.breaker_states()[api.host]["state"] == "open"
+
+        # Half open: requests wait for the probe, which closes the breaker
+        api.down = False
+        api.latency = 0.05
+        probe = asyncio.create_task(client.get_zones_info(api.host))
+        await asyncio.sleep(0.01)
+        assert client.breaker_states()[api.host]["state"] == "half_open"
+        monkeypatch.setattr(client_module, "breaker_reset_timeout", 30)
+        with pytest.raises(CircuitOpenException):
+            await client.get_zones_info(api.host)
+        assert await probe
+        assert client.breaker_states()[api.host] == {
+            "state": "closed",
+            "failures": 0,
+            "open_for": None,
+        }
+        assert await client.get_zones_info(api.host)
+        assert api.requests[ZONES_INFO] == 5
+
+
+async def test_breaker_stops_retries(client, socket_enabled, backoffs, monkeypatch) -> None:
+    """Retries end when the failures open the breaker"""
+    monkeypatch.setattr(client_module, "retry_attempts", 5)
+    monkeypatch.setattr(client_module, "breaker_failure_threshold", 2)
+    async with StandInApi() as api:
+        api.down = True
+        with pytest.raises(UnexpectedException):
+            await client.get_zones_info(api.host)
+        assert api.requests[ZONES_INFO] == 2
+        assert len(backoffs) == 1
+
+
+async def test_request_deadline(client, socket_enabled, monkeypatch) -> None:
+    """A request times out at the deadline, no retry outlasts it"""
+    monkeypatch.setattr(client_module, "breaker_failure_threshold", 10)
+    async with StandInApi(latency=0.2) as api:
+        with request_deadline(0.05):
+            with pytest.raises(UnexpectedException) as timed_out:
+                await client.get_zones_info(api.host)
+        assert isinstance(timed_out.value.__cause__, asyncio.TimeoutError)
+        # The backoff, up to retry_base_delay, doesn't fit the budget left
+        assert api.requests[ZONES_INFO] == 1
+
+        with request_deadline(0):
+            with pytest.raises(UnexpectedException, match="deadline"):
+                await client.get_zones_info(api.host)
+        assert api.requests[ZONES_INFO] == 1
+
+        # Tasks started within the block share the deadline
+        with request_deadline(0):
+            task = asyncio.create_task(client.get_zones_info(api.host))
+        with pytest.raises(UnexpectedException, match="deadline"):
+            await task
+
+        # Outside the block requests get request_timeout again
+        assert await client.get_zones_info(api.host)
+
+
+async def test_client_without_retries_and_breaker(socket_enabled, backoffs) -> None:
+    """A load test client sends every call once, however often it fails"""
+    client = OpenAudioClient(retry_attempts=1, circuit_breaker=False)
+    try:
+        async with StandInApi() as api:
+            api.down = True
+            for _ in range(client_module.breaker_failure_threshold + 1):
+                with pytest.raises(UnexpectedException) as failed:
+                    await client.get_zones_info(api.host)
+                assert not isinstance(failed.value, CircuitOpenException)
+            assert api.requests[ZONES_INFO] == client_module.breaker_failure_threshold + 1
+            assert not backoffs
+            assert client.breaker_states() == {}
+    finally:
+        await client.close()
@@ -0,0 +1,165 @@
+"""Volume commands coalesced by LatestValueCoalescer"""
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from custom_components.openaudio.hub import LatestValueCoalescer, OpenAudioHub
+
+from .standin import StandInApi
+
+ZONE_VOLUME = "/api/v3/zones/amp1-1/volume"
+
+
+async def test_drag_sends_few_puts(hass, socket_enabled) -> None:
+    """A slider drag costs a PUT per answer of the device, ends on its last value"""
+    async with StandInApi() as api:
+        hub = OpenAudioHub(hass, api.host)
+        try:
+            assert await hub.verify_connection()
+            # The device answers a PUT only when the test says so
+            answer = asyncio.Event()
+            send = hub.client.set_zone_volume
+
+            async def set_zone_volume(*args):
+                result = await send(*args)
+                await answer.wait()
+                answer.clear()
+                return result
+
+            hub.client.set_zone_volume = set_zone_volume
+            # 20 steps, the device answers every 5th
+            waiters = []
+            in_flight = None
+            for volume in range(41, 61):
+                waiters.append(
+                    asyncio.create_task(hub.set_zone_volume("amp1-1", volume))
+                )
+                await asyncio.sleep(0)
+                in_flight = in_flight or waiters[0]
+                if volume % 5 == 0:
+                    answer.set()
+                    await in_flight
+                    in_flight = waiters[-1]
+            answer.set()
+            await asyncio.gather(*waiters)
+        finally:
+            await hub.async_close()
+
+    volumes = [payload["volume"] for path, payload in api.puts if path == ZONE_VOLUME]
+    assert volumes == [41, 45, 50, 55, 60]
+    assert api.zones["amp1-1"]["volume"] == 60
+
+
+async def test_targets_are_independent(hass, socket_enabled) -> None:
+    """Values queued at once are sent once per zone, zones don't share a queue"""
+    async with StandInApi(latency=0.02) as api:
+        hub = OpenAudioHub(hass, api.host)
+        try:
+            assert await hub.verify_connection()
+            await asyncio.gather(
+                *(
+                    hub.set_zone_volume(zone_id, volume)
+                    for volume in (10, 20, 30)
+                    for zone_id in ("amp1-1", "amp1-2")
+                )
+            )
+        finally:
+            await hub.async_close()
+
+    assert sorted(api.puts) == [
+        ("/api/v3/zones/amp1-1/volume", {"volume": 30}),
+        ("/api/v3/zones/amp1-2/volume", {"volume": 30}),
+    ]
+    assert api.zones["amp1-1"]["volume"] == api.zones["amp1-2"]["volume"] == 30
+
+
+class FakeSend:
+    """Send that waits for the test to release it"""
+
+    def __init__(self) -> None:
+        self.sent: list = []
+        self.release = asyncio.Event()
+        self.error: Exception | None = None
+
+    async def __call__(self, value):
+        self.sent.append(value)
+        await self.release.wait()
+        self.release.clear()
+        if self.error is not None:
+            raise self.error
+        return f"sent {value}"
+
+
+async def test_replaced_waiters_share_the_newer_outcome() -> None:
+    """Callers whose value got replaced resolve with the value sent instead"""
+    coalescer = LatestValueCoalescer()
+    send = FakeSend()
+    first = coalescer.async_submit("zone", 1, send)
+    await asyncio.sleep(0)
+    replaced = coalescer.async_submit("zone", 2, send)
+    last = coalescer.async_submit("zone", 3, send)
+
+    send.release.set()
+    assert await first == "sent 1"
+    await asyncio.sleep(0)
+    send.release.set()
+    assert await replaced == await last == "sent 3"
+    assert send.sent == [1, 3]
+
+
+async def test_value_in_flight_is_not_sent_again() -> None:
+    """A drag back to the value on the wire drops the value queued meanwhile"""
+    coalescer = LatestValueCoalescer()
+    send = FakeSend()
+    first = coalescer.async_submit("zone", 1, send)
+    await asyncio.sleep(0)
+    replaced = coalescer.async_submit("zone", 2, send)
+    back = coalescer.async_submit("zone", 1, send)
+
+    send.release.set()
+    assert await first == await replaced == await back == "sent 1"
+    assert send.sent == [1]
+
+
+async def test_error_reaches_the_waiters_of_the_failed_value() -> None:
+    """A failed PUT fails its callers, the next value is still sent"""
+    coalescer = LatestValueCoalescer()
+    send = FakeSend()
+    first = coalescer.async_submit("zone", 1, send)
+    await asyncio.sleep(0)
+    second = coalescer.async_submit("zone", 2, send)
+
+    send.error = ValueError("rejected")
+    send.release.set()
+    with pytest.raises(ValueError):
+        await first
+    send.error = None
+    await asyncio.sleep(0)
+    send.release.set()
+    assert await second == "sent 2"
+
+
+async def test_shutdown_cancels_queued_and_in_flight() -> None:
+    """async_shutdown leaves no waiter pending and no queue stuck"""
+    coalescer = LatestValueCoalescer()
+    send = FakeSend()
+    in_flight = coalescer.async_submit("zone", 1, send)
+    await asyncio.sleep(0)
+    queued = coalescer.async_submit("zone", 2, send)
+    other = coalescer.async_submit("input", 5, send)
+
+    await coalescer.async_shutdown()
+
+    assert in_flight.cancelled()
+    assert queued.cancelled()
+    assert other.cancelled()
+    assert send.sent == [1]
+
+    # Nothing is left behind that would hold up a new value
+    again = coalescer.async_submit("input", 6, send)
+    await asyncio.sleep(0)
+    send.release.set()
+    async with asyncio.timeout(1):
+        assert await again == "sent 6"
@@ -0,0 +1,29 @@
+"""Diagnostics of the OpenAudio integration"""
+from __future__ import annotations
+
+import json
+
+from homeassistant.const import CONF_HOST
+
+from custom_components.openaudio.const import TIER_ZONES
+from custom_components.openaudio.diagnostics import (
+    async_get_config_entry_diagnostics,
+)
+
+from .common import refresh, setup_entry
+from .standin import StandInApi
+
+
+async def test_diagnostics_redact_the_host(hass, socket_enabled) -> None:
+    """The amplifier's address shows nowhere in the diagnostics"""
+    async with StandInApi() as api:
+        entry = await setup_entry(hass, api)
+        await refresh(hass, entry, TIER_ZONES)
+
+        diagnostics = await async_get_config_entry_diagnostics(hass, entry)
+        text = json.dumps(diagnostics, default=str)
+
+        assert entry.data[CONF_HOST] not in text
+        assert api.host.split(":")[0] not in text
+        assert diagnostics["circuit_breakers"]["hub"]["state"] == "closed"
+        assert await hass.config_entries.async_unload(entry.entry_id)
@@ -0,0 +1,103 @@
+"""OpenAudioHub against the stand-in API"""
+from __future__ import annotations
+
+import pytest
+
+from custom_components.openaudio.hub import OpenAudioHub
+from custom_components.openaudio.pyopenaudio import UnexpectedException
+
+from .standin import StandInApi
+
+
+async def test_fetch_data_builds_topology(hass, socket_enabled) -> None:
+    """Every device, zone and input of the system gets a record"""
+    async with StandInApi(devices=3, zones=4, inputs=2) as api:
+        hub = OpenAudioHub(hass, api.host)
+        try:
+            assert await hub.verify_connection()
+            await hub.initialize()
+            changes = await hub.fetch_data()
+        finally:
+            await hub.async_close()
+
+    assert changes.topology
+    assert set(hub.openaudios) == {"amp1", "amp2", "amp3"}
+    for device_id, (zone_ids, input_ids) in hub.topology.devices.items():
+        assert len(zone_ids) == 4
+        assert len(input_ids) == 2
+        assert set(hub.openaudios[device_id].zones) == set(zone_ids)
+    assert hub.server_device.device_id == "amp1"
+
+
+async def test_fetch_data_unavailable(hass, socket_enabled) -> None:
+    """A system that answers nothing fails the poll"""
+    async with StandInApi() as api:
+        api.down = True
+        hub = OpenAudioHub(hass, api.host)
+        try:
+            assert await hub.verify_connection()
+            with pytest.raises(UnexpectedException):
+                await hub.fetch_data()
+        finally:
+            await hub.async_close()
+
+
+@pytest.mark.parametrize("bulk_inputs", [True, False])
+async def test_fetch_topology(hass, socket_enabled, bulk_inputs: bool) -> None:
+    """Entities can be created before the first poll
+
+    Older firmware only reports the input ids in /inputs/info, the names
+    come from the input configs either way.
+    """
+    async with StandInApi(devices=2, zones=2, inputs=2, bulk_inputs=bulk_inputs) as api:
+        hub = OpenAudioHub(hass, api.host)
+        try:
+            await hub.fetch_topology()
+
+            assert set(hub.topology.inputs) == set(api.inputs)
+            assert set(hub.topology.zones) == set(api.zones)
+            assert hub.input_records["amp1-in1"].name == "Input 1"
+            assert not hub.freshness.stale
+            # Metrics are left to the first poll
+            assert not any("metrics" in request for request in api.requests)
+
+            # The configs are cached, the first poll doesn't fetch them again
+            api.reset_counters()
+            await hub.fetch_tier("zones")
+            assert not any("{input_id}" in request for request in api.requests)
+        finally:
+            await hub.async_close()
+
+
+@pytest.mark.parametrize("etags", [True, False])
+async def test_command_resets_validators(hass, socket_enabled, etags: bool) -> None:
+    """The poll after a command processes the payloads even if unchanged
+
+    A command the device ignored must still be reconciled with the state
+    the entity showed optimistically.
+    """
+    async with StandInApi(etags=etags) as api:
+        hub = OpenAudioHub(hass, api.host)
+        try:
+            assert await hub.verify_connection()
+            await hub.initialize()
+            get_zones_info = hub.client.get_zones_info
+            payloads = []
+
+            async def recording_get_zones_info(*args, **kwargs):
+                payloads.append(await get_zones_info(*args, **kwargs))
+                return payloads[-1]
+
+            hub.client.get_zones_info = recording_get_zones_info
+            await hub.fetch_data()
+            await hub.fetch_data()
+            # The same volume, the payload doesn't change
+            await hub.set_zone_volume("amp1-1", api.zones["amp1-1"]["volume"])
+            await hub.fetch_data()
+            await hub.fetch_data()
+        finally:
+            await hub.async_close()
+
+    assert [payload is not None for payload in payloads] == [True, False, True, False]
+    zones_info = hub.request_stats.endpoints["GET /api/v3/zones/info"]
+    assert zones_info.not_modified == (2 if etags else 0)
@@ -0,0 +1,298 @@
+"""Setup of the OpenAudio config entries"""
+from __future__ import annotations
+
+import asyncio
+
+from datetime import timedelta
+
+import pytest
+
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.const import CONF_HOST, STATE_UNAVAILABLE
+from homeassistant.helpers import device_registry as dr, entity_registry as er
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_fire_time_changed,
+)
+
+import custom_components.openaudio as integration
+from custom_components.openaudio import (
+    OpenAudioUpdateCoordinator,
+    async_remove_config_entry_device,
+)
+from custom_components.openaudio.const import (
+    ACTIVE_SCAN_INTERVAL,
+    ACTIVE_WINDOW,
+    CONF_PUSH_UPDATES,
+    DOMAIN,
+    PUSH_SCAN_INTERVAL,
+    SNAPSHOT_SAVE_DELAY,
+    TIER_DEVICES,
+    TIER_ZONES,
+)
+from custom_components.openaudio.hub import OpenAudioChanges, OpenAudioDevice
+
+from .common import refresh, setup_entry
+from .standin import StandInApi
+
+
+async def test_setup_without_bulk_input_records(hass, socket_enabled) -> None:
+    """A fresh install sets up when /inputs/info only reports the input ids"""
+    async with StandInApi(zones=2, inputs=2, bulk_inputs=False) as api:
+        entry = await setup_entry(hass, api)
+        assert entry.state is ConfigEntryState.LOADED
+        assert hass.states.get("media_player.amp_1_zone_1_zone") is not None
+        assert hass.states.get("media_player.amp_1_source_input_1_input") is not None
+
+        assert await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_block_till_done()
+
+
+async def test_setup_retried_without_devices(hass, socket_enabled) -> None:
+    """A system reporting no devices yet is set up once one shows"""
+    async with StandInApi() as api:
+        api.remove_device("amp1")
+        entry = MockConfigEntry(
+            domain=DOMAIN, data={CONF_HOST: api.host, CONF_PUSH_UPDATES: False}
+        )
+        entry.add_to_hass(hass)
+        assert not await hass.config_entries.async_setup(entry.entry_id)
+        assert entry.state is ConfigEntryState.SETUP_RETRY
+
+        api.restore_device("amp1")
+        assert await hass.config_entries.async_reload(entry.entry_id)
+        await hass.async_block_till_done()
+        assert entry.state is ConfigEntryState.LOADED
+        assert hass.states.get("media_player.amp_1_zone_1_zone") is not None
+
+        assert await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_block_till_done()
+
+
+async def test_device_leaves_and_returns(hass, socket_enabled) -> None:
+    """A device missing from a poll keeps its registry entries
+
+    Its entities show unavailable and come back with the user's names,
+    a reboot must not lose renames, areas or automation targets.
+    """
+    async with StandInApi(devices=2, zones=2, inputs=1) as api:
+        entry = await setup_entry(hass, api)
+        zone = "media_player.amp_2_zone_1_zone"
+        source = "media_player.amp_2_source_input_1_input"
+        sensor = "sensor.amp_2_cpu_usage"
+        for entity_id in (zone, source, sensor):
+            assert hass.states.get(entity_id).state != STATE_UNAVAILABLE
+        entity_registry = er.async_get(hass)
+        entity_registry.async_update_entity(zone, name="Kitchen")
+        device_registry = dr.async_get(hass)
+        device_id = entity_registry.async_get(zone).device_id
+
+        api.remove_device("amp2")
+        await refresh(hass, entry, TIER_DEVICES, TIER_ZONES)
+        for entity_id in (zone, source, sensor):
+            assert hass.states.get(entity_id).state == STATE_UNAVAILABLE, entity_id
+            assert entity_registry.async_get(entity_id) is not None
+        assert entry.entry_id in device_registry.async_get(device_id).config_entries
+        assert hass.states.get("media_player.amp_1_zone_1_zone").state != STATE_UNAVAILABLE
+
+        api.restore_device("amp2")
+        await refresh(hass, entry, TIER_DEVICES, TIER_ZONES)
+        for entity_id in (zone, source, sensor):
+            assert hass.states.get(entity_id).state != STATE_UNAVAILABLE, entity_id
+        assert hass.states.get(zone).name == "Kitchen"
+        assert entity_registry.async_get(zone).device_id == device_id
+
+        assert await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_block_till_done()
+
+
+async def test_remove_device_the_system_no_longer_reports(
+    hass, socket_enabled
+) -> None:
+    """Only a device that is gone can be deleted by the user"""
+    async with StandInApi(devices=2, zones=1, inputs=1) as api:
+        entry = await setup_entry(hass, api)
+        device_registry = dr.async_get(hass)
+        amp1, amp2 = (
+            device_registry.async_get_device(
+                identifiers={(DOMAIN, api.devices[device_id]["attributes"]["serial_number"])}
+            )
+            for device_id in ("amp1", "amp2")
+        )
+
+        assert not await async_remove_config_entry_device(hass, entry, amp2)
+        api.remove_device("amp2")
+        await refresh(hass, entry, TIER_DEVICES)
+        assert await async_remove_config_entry_device(hass, entry, amp2)
+        assert not await async_remove_config_entry_device(hass, entry, amp1)
+
+        assert await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_block_till_done()
+
+
+async def test_stale_entities_are_replaced(hass, socket_enabled) -> None:
+    """Entities still bound to a replaced device record are recreated"""
+    async with StandInApi(devices=2, zones=1, inputs=1) as api:
+        entry = await setup_entry(hass, api)
+        hub = hass.data[DOMAIN][entry.entry_id]["hub"]
+        coordinators = hass.data[DOMAIN][entry.entry_id]["coordinators"]
+
+        # The device left and came back without the platform noticing
+        old_amp = hub.openaudios["amp2"]
+        new_amp = OpenAudioDevice(hub)
+        new_amp.update(old_amp.raw)
+        new_amp.zones = dict(old_amp.zones)
+        new_amp.inputs = dict(old_amp.inputs)
+        hub.openaudios["amp2"] = new_amp
+        coordinators[TIER_DEVICES].async_set_updated_data(OpenAudioChanges(topology=True))
+        await hass.async_block_till_done()
+
+        for entity_id in (
+            "media_player.amp_2_zone_1_zone",
+            "sensor.amp_2_cpu_usage",
+        ):
+            domain = entity_id.partition(".")[0]
+            entity = hass.data[domain].get_entity(entity_id)
+            assert entity is not None, entity_id
+            assert entity._amp is new_amp
+
+        assert await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_block_till_done()
+
+
+async def test_fresh_install_saves_a_snapshot(
+    hass, socket_enabled, hass_storage
+) -> None:
+    """The next start restores the topology even if nothing changed since"""
+    async with StandInApi() as api:
+        entry = await setup_entry(hass, api)
+        async_fire_time_changed(
+            hass, dt_util.utcnow() + timedelta(seconds=SNAPSHOT_SAVE_DELAY + 1)
+        )
+        await hass.async_block_till_done()
+
+        assert f"{DOMAIN}.{entry.entry_id}" in hass_storage
+        assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def _restart(hass, entry: MockConfigEntry, hass_storage, damage) -> dict:
+    """Unload entry, damage its saved snapshot and set it up again"""
+    async_fire_time_changed(
+        hass, dt_util.utcnow() + timedelta(seconds=SNAPSHOT_SAVE_DELAY + 1)
+    )
+    await hass.async_block_till_done()
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    damage(hass_storage[f"{DOMAIN}.{entry.entry_id}"])
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    hub = hass.data[DOMAIN][entry.entry_id]["hub"]
+    async with asyncio.timeout(5):
+        while "complete" not in hub.setup_timings:
+            await asyncio.sleep(0.01)
+    await hass.async_block_till_done()
+    return hub.setup_timings
+
+
+def _truncate(stored: dict) -> None:
+    del stored["data"]["zones"]
+
+
+def _drop_zone_ids(stored: dict) -> None:
+    for zone in stored["data"]["zones"]:
+        del zone["zone_id"]
+
+
+def _older_version(stored: dict) -> None:
+    stored["version"] = 0
+
+
+@pytest.mark.parametrize("damage", [_truncate, _drop_zone_ids, _older_version])
+async def test_unreadable_snapshot_is_fetched_anew(
+    hass, socket_enabled, hass_storage, damage
+) -> None:
+    """A snapshot the setup can't read is dropped, the topology fetched"""
+    async with StandInApi(zones=2, inputs=2) as api:
+        entry = await setup_entry(hass, api)
+        setup_timings = await _restart(hass, entry, hass_storage, damage)
+
+        assert entry.state is ConfigEntryState.LOADED
+        assert "topology" in setup_timings
+        hub = hass.data[DOMAIN][entry.entry_id]["hub"]
+        assert set(hub.openaudios) == {"amp1"}
+        assert set(hub.openaudios["amp1"].zones) == {"amp1-1", "amp1-2"}
+        assert hass.states.get("media_player.amp_1_zone_1_zone") is not None
+        assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_snapshot_restores_the_topology(
+    hass, socket_enabled, hass_storage
+) -> None:
+    """A readable snapshot spares the restart the topology fetch"""
+    async with StandInApi(zones=2, inputs=2) as api:
+        entry = await setup_entry(hass, api)
+        setup_timings = await _restart(hass, entry, hass_storage, lambda stored: None)
+
+        assert entry.state is ConfigEntryState.LOADED
+        assert "topology" not in setup_timings
+        assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+class FrozenClock:
+    """Stands in for the time module, monotonic only moves when told"""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+async def test_adaptive_interval(hass, monkeypatch) -> None:
+    """Fast polls for a while after a change, then doubling up to the max"""
+    clock = FrozenClock()
+    monkeypatch.setattr(integration, "time", clock)
+    coordinator = OpenAudioUpdateCoordinator(hass, None, TIER_ZONES, 30, 300)
+    intervals = []
+    coordinator.async_add_interval_listener(
+        lambda: intervals.append(coordinator.update_interval.total_seconds())
+    )
+
+    def adapt(changed: bool = False) -> float:
+        coordinator._async_adapt_interval(changed)
+        return coordinator.update_interval.total_seconds()
+
+    assert adapt(changed=True) == ACTIVE_SCAN_INTERVAL
+    clock.now += ACTIVE_WINDOW - 1
+    assert adapt() == ACTIVE_SCAN_INTERVAL
+
+    # Idle: every poll finding nothing new doubles the interval
+    clock.now += 1
+    assert [adapt() for _ in range(6)] == [30, 60, 120, 240, 300, 300]
+
+    # A change within the window restarts it and the backoff
+    assert adapt(changed=True) == ACTIVE_SCAN_INTERVAL
+    clock.now += ACTIVE_WINDOW
+    assert adapt() == 30
+
+    assert adapt() == 60
+
+    # Once the push channel is lost polls back off from the start
+    coordinator.async_set_push_connected(True)
+    assert coordinator.update_interval.total_seconds() == PUSH_SCAN_INTERVAL
+    coordinator.async_set_push_connected(False)
+    assert coordinator.update_interval.total_seconds() == 30
+    assert adapt() == 60
+
+    # Listeners hear of every change, not of intervals that stayed
+    assert intervals == [
+        5, 30, 60, 120, 240, 300, 5, 30, 60, PUSH_SCAN_INTERVAL, 30, 60
+    ]
+
+
+async def test_fixed_interval(hass) -> None:
+    """Without a max update interval the interval stays the configured one"""
+    coordinator = OpenAudioUpdateCoordinator(hass, None, TIER_ZONES, 30)
+    coordinator.async_note_activity()
+    coordinator._async_adapt_interval(changed=True)
+    assert coordinator.update_interval == timedelta(seconds=30)
@@ -0,0 +1,142 @@
+"""Media players of the OpenAudio integration"""
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from homeassistant.components.media_player import (
+    ATTR_MEDIA_VOLUME_LEVEL,
+    DOMAIN as MEDIA_PLAYER_DOMAIN,
+    SERVICE_VOLUME_SET,
+)
+from homeassistant.const import ATTR_ENTITY_ID, EVENT_STATE_CHANGED
+from homeassistant.core import callback
+
+from custom_components.openaudio.const import DOMAIN, TIER_ZONES
+from custom_components.openaudio.pyopenaudio import UnexpectedException
+
+from .common import refresh, setup_entry
+from .standin import StandInApi
+
+ZONE = "media_player.amp_1_zone_1_zone"
+INPUT = "media_player.amp_1_source_input_1_input"
+ZONE_VOLUME = "PUT /api/v3/zones/{zone_id}/volume"
+
+
+async def _set_volume(hass, volume_level: float) -> None:
+    await hass.services.async_call(
+        MEDIA_PLAYER_DOMAIN,
+        SERVICE_VOLUME_SET,
+        {ATTR_ENTITY_ID: ZONE, ATTR_MEDIA_VOLUME_LEVEL: volume_level},
+        blocking=True,
+    )
+
+
+async def test_partial_poll_flags_stale_inputs(hass, socket_enabled) -> None:
+    """Zones refresh while /inputs/info fails, only the inputs show stale"""
+    async with StandInApi(zones=1, inputs=1) as api:
+        entry = await setup_entry(hass, api)
+        assert "stale" not in hass.states.get(INPUT).attributes
+
+        api.failing.add("GET /api/v3/inputs/info")
+        api.zones["amp1-1"]["volume"] = 55
+        api.inputs["amp1-in1"]["volume"] = 80
+        await refresh(hass, entry, TIER_ZONES)
+
+        zone = hass.states.get(ZONE)
+        assert zone.attributes["volume_level"] == 0.55
+        assert "stale" not in zone.attributes
+        source = hass.states.get(INPUT)
+        assert source.attributes["volume_level"] == 0.5
+        assert source.attributes["stale"] is True
+        assert source.attributes["data_age"] >= 0
+        assert "stale" not in hass.states.get("sensor.amp_1_cpu_usage").attributes
+
+        api.failing.clear()
+        await refresh(hass, entry, TIER_ZONES)
+        source = hass.states.get(INPUT)
+        assert source.attributes["volume_level"] == 0.8
+        assert "stale" not in source.attributes
+        assert "data_age" not in source.attributes
+        assert "stale" not in hass.states.get(ZONE).attributes
+
+        assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_volume_shown_before_the_command_completes(hass, socket_enabled) -> None:
+    """The new volume is written right away, the PUT follows"""
+    async with StandInApi(zones=1, inputs=1) as api:
+        entry = await setup_entry(hass, api)
+        hub = hass.data[DOMAIN][entry.entry_id]["hub"]
+        writes = hub.entity_writes
+        api.latency = 0.1
+
+        command = asyncio.create_task(_set_volume(hass, 0.55))
+        async with asyncio.timeout(1):
+            while hass.states.get(ZONE).attributes["volume_level"] != 0.55:
+                await asyncio.sleep(0.01)
+        assert not command.done()
+        assert hub.entity_writes == writes + 1
+
+        await command
+        assert api.puts == [("/api/v3/zones/amp1-1/volume", {"volume": 55})]
+        assert api.zones["amp1-1"]["volume"] == 55
+        assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_unchanged_volume_is_not_sent(hass, socket_enabled) -> None:
+    """Setting the volume the zone already has skips the network"""
+    async with StandInApi(zones=1, inputs=1) as api:
+        entry = await setup_entry(hass, api)
+        hub = hass.data[DOMAIN][entry.entry_id]["hub"]
+        writes = hub.entity_writes
+
+        await _set_volume(hass, 0.3)
+        assert api.requests[ZONE_VOLUME] == 0
+        assert hub.entity_writes == writes
+        assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_failed_command_is_rolled_back(hass, socket_enabled) -> None:
+    """A volume the device refused is replaced by the one it had"""
+    async with StandInApi(zones=1, inputs=1) as api:
+        entry = await setup_entry(hass, api)
+        shown = []
+
+        @callback
+        def _state_changed(event) -> None:
+            if event.data["entity_id"] == ZONE:
+                shown.append(event.data["new_state"].attributes.get("volume_level"))
+
+        hass.bus.async_listen(EVENT_STATE_CHANGED, _state_changed)
+        api.down = True
+        with pytest.raises(UnexpectedException):
+            await _set_volume(hass, 0.55)
+        assert api.requests[ZONE_VOLUME] == 1
+        assert hass.states.get(ZONE).attributes["volume_level"] == 0.3
+        assert shown == [0.55, 0.3]
+
+        api.down = False
+        await hass.async_block_till_done()
+        assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_rollback_of_a_zone_gone_meanwhile(
+    hass, socket_enabled, monkeypatch
+) -> None:
+    """A zone no longer reported when its command fails isn't rolled back"""
+    async with StandInApi(zones=1, inputs=1) as api:
+        entry = await setup_entry(hass, api)
+        hub = hass.data[DOMAIN][entry.entry_id]["hub"]
+
+        async def set_zone_volume(zone_id: str, volume: int):
+            api.zones.pop(zone_id)
+            await refresh(hass, entry, TIER_ZONES)
+            raise UnexpectedException(503)
+
+        monkeypatch.setattr(hub, "set_zone_volume", set_zone_volume)
+        with pytest.raises(UnexpectedException):
+            await _set_volume(hass, 0.55)
+        assert "amp1-1" not in hub.openaudios["amp1"].zones
+        assert await hass.config_entries.async_unload(entry.entry_id)
@@ -0,0 +1,91 @@
+"""Push updates over the event channel of the stand-in API"""
+from __future__ import annotations
+
+import asyncio
+
+from homeassistant.const import CONF_HOST
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.openaudio import push
+from custom_components.openaudio.const import DOMAIN, PUSH_SCAN_INTERVAL, TIER_ZONES
+
+from .common import setup_entry
+from .standin import StandInApi
+
+ZONE = "media_player.amp_1_zone_1_zone"
+
+
+async def wait_for(condition) -> None:
+    """Wait until condition() holds"""
+    async with asyncio.timeout(5):
+        while not condition():
+            await asyncio.sleep(0.01)
+
+
+async def test_push_is_opt_in(hass, socket_enabled) -> None:
+    """An entry that doesn't ask for push updates only polls"""
+    async with StandInApi() as api:
+        entry = MockConfigEntry(domain=DOMAIN, data={CONF_HOST: api.host})
+        entry.add_to_hass(hass)
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+
+        assert hass.data[DOMAIN][entry.entry_id]["push"] is None
+        assert api.event_channels == 0
+        assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_pushed_zone_event(hass, socket_enabled) -> None:
+    """A zone event is applied without a poll"""
+    async with StandInApi() as api:
+        entry = await setup_entry(hass, api, push_updates=True)
+        listener = hass.data[DOMAIN][entry.entry_id]["push"]
+        await wait_for(lambda: listener.connected)
+        await hass.async_block_till_done()
+        api.reset_counters()
+
+        await api.push({"type": "zone", "zone_id": "amp1-1", "data": {"volume": 70}})
+        await wait_for(
+            lambda: hass.states.get(ZONE).attributes["volume_level"] == 0.7
+        )
+        assert not api.requests
+        assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_frames_that_are_not_events(hass, socket_enabled) -> None:
+    """Valid JSON that isn't an event object leaves the listener running"""
+    async with StandInApi() as api:
+        entry = await setup_entry(hass, api, push_updates=True)
+        listener = hass.data[DOMAIN][entry.entry_id]["push"]
+        await wait_for(lambda: listener.connected)
+
+        for frame in ("keepalive", [1, 2], 3, None):
+            await api.push(frame)
+        await api.push({"type": "zone", "zone_id": "amp1-1", "data": {"volume": 10}})
+        await wait_for(
+            lambda: hass.states.get(ZONE).attributes["volume_level"] == 0.1
+        )
+        assert listener.connected
+        assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_channel_loss_falls_back_to_polling(
+    hass, socket_enabled, monkeypatch
+) -> None:
+    """Polling resumes while the channel is down, then the listener reconnects"""
+    monkeypatch.setattr(push, "PUSH_RECONNECT_MIN_DELAY", 0.01)
+    async with StandInApi() as api:
+        entry = await setup_entry(hass, api, push_updates=True)
+        data = hass.data[DOMAIN][entry.entry_id]
+        listener = data["push"]
+        coordinator = data["coordinators"][TIER_ZONES]
+        await wait_for(lambda: listener.connected)
+        assert coordinator.update_interval.total_seconds() == PUSH_SCAN_INTERVAL
+
+        await api.close_events()
+        await wait_for(lambda: not listener.connected)
+        assert coordinator.update_interval.total_seconds() < PUSH_SCAN_INTERVAL
+
+        await wait_for(lambda: listener.connected)
+        assert api.event_channels == 1
+        assert await hass.config_entries.async_unload(entry.entry_id)
@@ -0,0 +1,96 @@
+"""Sensors of the OpenAudio integration"""
+from __future__ import annotations
+
+import asyncio
+
+from datetime import timedelta
+
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+import custom_components.openaudio as integration
+from custom_components.openaudio.const import (
+    ACTIVE_SCAN_INTERVAL,
+    DOMAIN,
+    PUSH_SCAN_INTERVAL,
+    TIER_DEVICES,
+    TIER_ZONES,
+)
+
+from .common import refresh, setup_entry
+from .test_init import FrozenClock
+from .standin import StandInApi
+
+
+async def test_devices_tier_reaches_metrics_sensors(hass, socket_enabled) -> None:
+    """/devices/info carries connection info, the metrics sensors show it"""
+    async with StandInApi() as api:
+        entry = await setup_entry(hass, api)
+        assert hass.states.get("sensor.amp_1_ssid").state == "openaudio"
+
+        api.devices["amp1"]["connection"]["ssid"] = "other"
+        api.devices["amp1"]["metrics"]["cpu_usage"] = 80.0
+        await refresh(hass, entry, TIER_DEVICES)
+
+        assert hass.states.get("sensor.amp_1_ssid").state == "other"
+        assert hass.states.get("sensor.amp_1_cpu_usage").state == "80.0"
+        assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_pushed_device_event_reaches_metrics_sensors(
+    hass, socket_enabled
+) -> None:
+    """A pushed device event is shown without waiting for a poll"""
+    async with StandInApi() as api:
+        entry = await setup_entry(hass, api, push_updates=True)
+        async with asyncio.timeout(5):
+            while api.event_channels == 0:
+                await asyncio.sleep(0.01)
+
+        await api.push(
+            {
+                "type": "device",
+                "device_id": "amp1",
+                "data": {"connection": {"type": "wifi", "ssid": "pushed"}},
+            }
+        )
+        async with asyncio.timeout(5):
+            while hass.states.get("sensor.amp_1_ssid").state != "pushed":
+                await asyncio.sleep(0.01)
+        assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_poll_interval_follows_the_coordinator(
+    hass, socket_enabled, monkeypatch
+) -> None:
+    """Interval changes between polls are shown, a command polls right away"""
+    clock = FrozenClock()
+    monkeypatch.setattr(integration, "time", clock)
+    async with StandInApi() as api:
+        entry = await setup_entry(hass, api)
+        hub = hass.data[DOMAIN][entry.entry_id]["hub"]
+        coordinator = hass.data[DOMAIN][entry.entry_id]["coordinators"][TIER_ZONES]
+        sensor = "sensor.amp_1_poll_interval"
+
+        coordinator.async_set_push_connected(True)
+        assert float(hass.states.get(sensor).state) == PUSH_SCAN_INTERVAL
+        coordinator.async_set_push_connected(False)
+        assert float(hass.states.get(sensor).state) == 30
+
+        await refresh(hass, entry, TIER_ZONES)
+        assert float(hass.states.get(sensor).state) == 60
+
+        # A burst of commands is confirmed by a single poll
+        api.reset_counters()
+        for volume in (40, 45, 50):
+            await hub.set_zone_volume("amp1-1", volume)
+        await hass.async_block_till_done()
+        assert float(hass.states.get(sensor).state) == ACTIVE_SCAN_INTERVAL
+        assert api.requests["GET /api/v3/zones/info"] == 0
+
+        async_fire_time_changed(
+            hass, dt_util.utcnow() + timedelta(seconds=ACTIVE_SCAN_INTERVAL)
+        )
+        await hass.async_block_till_done()
+        assert api.requests["GET /api/v3/zones/info"] == 1
+        assert await hass.config_entries.async_unload(entry.entry_id)
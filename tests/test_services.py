@@ -0,0 +1,177 @@
+"""Services of the OpenAudio integration"""
+from __future__ import annotations
+
+import cProfile
+import tracemalloc
+
+import pytest
+import voluptuous as vol
+
+from homeassistant.exceptions import HomeAssistantError
+
+from custom_components.openaudio.const import (
+    DOMAIN,
+    SERVICE_APPLY_ZONES,
+    SERVICE_PROFILE,
+    TIER_ZONES,
+)
+
+from .common import refresh, setup_entry
+from .standin import StandInApi
+
+
+async def _apply_zones(hass, zones: list[dict]) -> dict:
+    return await hass.services.async_call(
+        DOMAIN,
+        SERVICE_APPLY_ZONES,
+        {"zones": zones},
+        blocking=True,
+        return_response=True,
+    )
+
+
+async def test_apply_zones(hass, socket_enabled) -> None:
+    """Targets are applied and refreshed once, every zone gets a result"""
+    async with StandInApi(zones=2, inputs=2) as api:
+        entry = await setup_entry(hass, api)
+        api.reset_counters()
+
+        response = await _apply_zones(
+            hass,
+            [
+                {"zone_id": "amp1-1", "volume": 25, "input": "amp1-in2"},
+                {"zone_id": "amp1-2", "input": None},
+                {"zone_id": "amp9-1", "volume": 10},
+            ],
+        )
+
+        assert response == {
+            "zones": {
+                "amp1-1": {"success": True},
+                "amp1-2": {"success": True},
+                "amp9-1": {"success": False, "error": "Unknown zone"},
+            }
+        }
+        assert api.zones["amp1-1"]["volume"] == 25
+        assert api.zones["amp1-1"]["input"] == ["amp1-in2"]
+        assert api.zones["amp1-2"]["input"] == []
+        assert api.requests["GET /api/v3/zones/info"] == 1
+        state = hass.states.get("media_player.amp_1_zone_1_zone")
+        assert state.attributes["volume_level"] == 0.25
+        assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_apply_zones_skips_what_zones_show(hass, socket_enabled) -> None:
+    """Targets a zone already shows are reported applied without a PUT"""
+    async with StandInApi(zones=2, inputs=2) as api:
+        entry = await setup_entry(hass, api)
+        api.reset_counters()
+
+        response = await _apply_zones(
+            hass,
+            [
+                {"zone_id": "amp1-1", "volume": 30, "input": "amp1-in2"},
+                {"zone_id": "amp1-2", "volume": 25, "input": "amp1-in1"},
+            ],
+        )
+
+        assert response["zones"] == {
+            "amp1-1": {"success": True},
+            "amp1-2": {"success": True},
+        }
+        assert api.puts == [("/api/v3/zones/amp1-2/volume", {"volume": 25})]
+        assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_apply_zones_reports_failures(hass, socket_enabled) -> None:
+    """A zone the device refuses is reported, the others are applied"""
+    async with StandInApi(zones=2, inputs=1) as api:
+        entry = await setup_entry(hass, api)
+        del api.zones["amp1-2"]
+
+        response = await _apply_zones(
+            hass,
+            [{"zone_id": "amp1-1", "volume": 25}, {"zone_id": "amp1-2", "volume": 25}],
+        )
+
+        assert response["zones"]["amp1-1"] == {"success": True}
+        assert response["zones"]["amp1-2"]["success"] is False
+        assert response["zones"]["amp1-2"]["error"]
+        assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_apply_zones_rejects_duplicate_zones(hass, socket_enabled) -> None:
+    """A zone targeted twice is rejected before anything is sent"""
+    async with StandInApi(zones=1, inputs=1) as api:
+        entry = await setup_entry(hass, api)
+
+        with pytest.raises(vol.Invalid, match="amp1-1"):
+            await _apply_zones(
+                hass,
+                [{"zone_id": "amp1-1", "volume": 25}, {"zone_id": "amp1-1", "volume": 50}],
+            )
+        assert api.puts == []
+        assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_profile(hass, socket_enabled, tmp_path) -> None:
+    """The profile covers count refreshes, then its results are written"""
+    hass.config.config_dir = str(tmp_path)
+    async with StandInApi(zones=1, inputs=1) as api:
+        entry = await setup_entry(hass, api)
+        hub = hass.data[DOMAIN][entry.entry_id]["hub"]
+
+        await hass.services.async_call(
+            DOMAIN,
+            SERVICE_PROFILE,
+            {"count": 2, "tracemalloc": True},
+            blocking=True,
+        )
+        assert hub.profiler is not None
+        assert tracemalloc.is_tracing()
+        await refresh(hass, entry, TIER_ZONES, TIER_ZONES)
+
+        assert hub.profiler is None
+        assert not tracemalloc.is_tracing()
+        assert sorted(path.suffix for path in tmp_path.glob(f"{DOMAIN}_profile_*")) == [
+            ".prof",
+            ".txt",
+        ]
+        assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+class BusyProfile:
+    """cProfile.Profile while another profiler is enabled"""
+
+    def enable(self) -> None:
+        raise ValueError("Another profiling tool is already active")
+
+
+async def test_profile_refused_while_another_profiler_runs(
+    hass, socket_enabled, monkeypatch
+) -> None:
+    """A running cProfile or tracemalloc user is left alone"""
+    async with StandInApi(zones=1, inputs=1) as api:
+        entry = await setup_entry(hass, api)
+        hub = hass.data[DOMAIN][entry.entry_id]["hub"]
+
+        with monkeypatch.context() as patch:
+            patch.setattr(cProfile, "Profile", BusyProfile)
+            with pytest.raises(HomeAssistantError, match="profiler"):
+                await hass.services.async_call(
+                    DOMAIN, SERVICE_PROFILE, {"tracemalloc": True}, blocking=True
+                )
+            assert not tracemalloc.is_tracing()
+
+        tracemalloc.start()
+        try:
+            with pytest.raises(HomeAssistantError, match="tracemalloc"):
+                await hass.services.async_call(
+                    DOMAIN, SERVICE_PROFILE, {"tracemalloc": True}, blocking=True
+                )
+            assert tracemalloc.is_tracing()
+        finally:
+            tracemalloc.stop()
+
+        assert hub.profiler is None
+        assert await hass.config_entries.async_unload(entry.entry_id)
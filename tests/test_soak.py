@@ -0,0 +1,36 @@
+"""A short run of the soak test"""
+from __future__ import annotations
+
+import argparse
+import logging
+
+from bench import soak
+
+
+async def test_soak(hass, socket_enabled, caplog) -> None:
+    """Churn, bursts and outages stay within the bounds"""
+    # Thousands of requests, keep the captured log small
+    caplog.set_level(logging.WARNING)
+    # and don't record where every task was created
+    hass.loop.set_debug(False)
+    parser = argparse.ArgumentParser()
+    soak.add_soak_arguments(parser)
+    args = parser.parse_args(
+        [
+            "--cycles=400",
+            "--churn-every=50",
+            "--burst-every=20",
+            "--outage-every=150",
+            "--outage-cycles=2",
+            "--breaker-reset-timeout=0.05",
+            "--failure-pause=0.01",
+            "--sample-every=50",
+            "--warmup=100",
+        ]
+    )
+    results = await soak.soak(hass, args)
+
+    assert results["violations"] == []
+    assert results["outages"] == 2
+    assert results["failed_polls"]
+    assert results["puts"]